@@ -0,0 +1,140 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from prometheus_client import Counter
+
+from app.api.core.database import redis_client
+
+CACHE_INVALIDATION_CHANNEL = "adme:cache:invalidate"
+
+CACHE_LOOKUPS = Counter(
+    "local_cache_lookups_total", "Process-local cache lookups", ["cache", "result"]
+)
+CACHE_EVICTIONS = Counter(
+    "local_cache_evictions_total", "Process-local cache evictions", ["cache", "reason"]
+)
+
+# Every TTLCache registers itself here so invalidation messages can find it by name.
+_registry: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """
+    Process-local LRU cache whose entries expire `ttl` seconds after being set.
+    Once `maxsize` entries are held, or the entries' summed `weight` exceeds
+    `maxweight`, the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self, name: str, maxsize: int, ttl: float, maxweight: Optional[int] = None
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxweight = maxweight
+        self.weight = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any, int]]" = OrderedDict()
+        _registry[name] = self
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            CACHE_LOOKUPS.labels(self.name, "miss").inc()
+            return None
+
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            CACHE_EVICTIONS.labels(self.name, "expired").inc()
+            CACHE_LOOKUPS.labels(self.name, "miss").inc()
+            return None
+
+        self._data.move_to_end(key)
+        CACHE_LOOKUPS.labels(self.name, "hit").inc()
+        return value
+
+    def set(self, key: Hashable, value: Any, weight: int = 0) -> None:
+        if self.maxweight is not None and weight > self.maxweight:
+            return
+        self._remove(key)
+        self._data[key] = (time.monotonic() + self.ttl, value, weight)
+        self.weight += weight
+        while len(self._data) > self.maxsize or (
+            self.maxweight is not None and self.weight > self.maxweight
+        ):
+            self._remove(next(iter(self._data)))
+            CACHE_EVICTIONS.labels(self.name, "size").inc()
+
+    def pop(self, key: Hashable) -> None:
+        if self._remove(key):
+            CACHE_EVICTIONS.labels(self.name, "invalidated").inc()
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.weight = 0
+
+    def _remove(self, key: Hashable) -> bool:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return False
+        self.weight -= entry[2]
+        return True
+
+
+async def publish_invalidation(cache_name: str, *keys: str) -> None:
+    """
+    Drops `keys` from the named cache in this process and asks every other
+    worker to do the same through Redis pub/sub.
+    """
+    cache = _registry.get(cache_name)
+    if cache is not None:
+        for key in keys:
+            cache.pop(key)
+
+    message = json.dumps({"cache": cache_name, "keys": list(keys)})
+    try:
+        await redis_client.publish(CACHE_INVALIDATION_CHANNEL, message)
+    except Exception as e:
+        # Other workers fall back to TTL expiry when Redis is unreachable.
+        print(f"Warning: failed to publish cache invalidation for {cache_name}: {e}")
+
+
+async def listen_for_invalidations(retry_delay: float = 5.0) -> None:
+    """
+    Long-running task that applies invalidations published by other workers.
+    """
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(CACHE_INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    data = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                cache = _registry.get(data.get("cache"))
+                if cache is None:
+                    continue
+                for key in data.get("keys", []):
+                    cache.pop(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Warning: cache invalidation listener failed, retrying: {e}")
+            # Anything published while disconnected was missed; start cold.
+            for cache in _registry.values():
+                cache.clear()
+            await asyncio.sleep(retry_delay)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 import os
+from typing import Optional
 
 load_dotenv()
 
@@ -13,12 +14,163 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL")
     REDIS_URL: str = os.getenv("REDIS_URL")
+    # Logs every statement synchronously; keep off outside local debugging
+    DB_ECHO: bool = os.getenv("DB_ECHO", "false").lower() == "true"
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    # asyncpg prepared statements cached per connection; 0 behind PgBouncer
+    # in transaction pooling mode
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+    # Optional streaming replica for read-only endpoints; unset means the
+    # primary serves everything
+    DATABASE_REPLICA_URL: Optional[str] = os.getenv("DATABASE_REPLICA_URL") or None
+    DB_REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("DB_REPLICA_MAX_LAG_SECONDS", "5"))
+    DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = float(
+        os.getenv("DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS", "5")
+    )
+
+    # Password hashing
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    # Jobs allowed to run or wait for a worker before logins get 503
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+    # Authenticated principal cache (get_current_user)
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL_SECONDS: int = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
 
     # GitHub OAuth
     GITHUB_CLIENT_ID: str = os.getenv("GITHUB_CLIENT_ID")
     GITHUB_CLIENT_SECRET: str = os.getenv("GITHUB_CLIENT_SECRET")
     GITHUB_REDIRECT_URI: str = os.getenv("GITHUB_REDIRECT_URI")
     GITHUB_WEBHOOK_SECRET: str = os.getenv("GITHUB_WEBHOOK_SECRET")
+    GITHUB_TOKEN_CACHE_SIZE: int = int(os.getenv("GITHUB_TOKEN_CACHE_SIZE", "10000"))
+    GITHUB_TOKEN_CACHE_TTL_SECONDS: int = int(
+        os.getenv("GITHUB_TOKEN_CACHE_TTL_SECONDS", "60")
+    )
+
+    # Webhook ingestion
+    WEBHOOK_FAST_ACK: bool = os.getenv("WEBHOOK_FAST_ACK", "false").lower() == "true"
+    WEBHOOK_BUFFER_SIZE: int = int(os.getenv("WEBHOOK_BUFFER_SIZE", "10000"))
+    WEBHOOK_FLUSH_ROWS: int = int(os.getenv("WEBHOOK_FLUSH_ROWS", "500"))
+    WEBHOOK_FLUSH_INTERVAL_MS: int = int(os.getenv("WEBHOOK_FLUSH_INTERVAL_MS", "50"))
+    WEBHOOK_SECRET_CACHE_SIZE: int = int(os.getenv("WEBHOOK_SECRET_CACHE_SIZE", "10000"))
+    WEBHOOK_SECRET_CACHE_TTL_SECONDS: int = int(
+        os.getenv("WEBHOOK_SECRET_CACHE_TTL_SECONDS", "300")
+    )
+    # GitHub caps webhook payloads at 25 MB
+    WEBHOOK_MAX_BODY_BYTES: int = int(os.getenv("WEBHOOK_MAX_BODY_BYTES", str(25 * 1024 * 1024)))
+    WEBHOOK_DEDUP_TTL_SECONDS: int = int(os.getenv("WEBHOOK_DEDUP_TTL_SECONDS", "86400"))
+    # GitHub only redelivers deliveries from the past 3 days
+    WEBHOOK_DELIVERY_RETENTION_DAYS: float = float(
+        os.getenv("WEBHOOK_DELIVERY_RETENTION_DAYS", "7")
+    )
+    WEBHOOK_DELIVERY_PRUNE_INTERVAL_SECONDS: float = float(
+        os.getenv("WEBHOOK_DELIVERY_PRUNE_INTERVAL_SECONDS", "3600")
+    )
+    WEBHOOK_DELIVERY_PRUNE_BATCH_SIZE: int = int(
+        os.getenv("WEBHOOK_DELIVERY_PRUNE_BATCH_SIZE", "10000")
+    )
+
+    # GitHub API
+    GITHUB_FETCH_CONCURRENCY: int = int(os.getenv("GITHUB_FETCH_CONCURRENCY", "10"))
+    GITHUB_HTTP2: bool = os.getenv("GITHUB_HTTP2", "false").lower() == "true"
+    GITHUB_TIMEOUT_SECONDS: float = float(os.getenv("GITHUB_TIMEOUT_SECONDS", "10"))
+    GITHUB_CONNECT_TIMEOUT_SECONDS: float = float(
+        os.getenv("GITHUB_CONNECT_TIMEOUT_SECONDS", "5")
+    )
+    GITHUB_API_MAX_CONNECTIONS: int = int(os.getenv("GITHUB_API_MAX_CONNECTIONS", "50"))
+    GITHUB_WEB_MAX_CONNECTIONS: int = int(os.getenv("GITHUB_WEB_MAX_CONNECTIONS", "10"))
+    GITHUB_KEEPALIVE_EXPIRY_SECONDS: float = float(
+        os.getenv("GITHUB_KEEPALIVE_EXPIRY_SECONDS", "30")
+    )
+    GITHUB_HTTP_CACHE: bool = os.getenv("GITHUB_HTTP_CACHE", "true").lower() == "true"
+    GITHUB_HTTP_CACHE_TTL_SECONDS: int = int(
+        os.getenv("GITHUB_HTTP_CACHE_TTL_SECONDS", "86400")
+    )
+    GITHUB_HTTP_CACHE_MAX_BODY_BYTES: int = int(
+        os.getenv("GITHUB_HTTP_CACHE_MAX_BODY_BYTES", str(1024 * 1024))
+    )
+    # Parsed bodies of conditional-cache hits, kept per worker. Bounded by raw
+    # body bytes (parsed objects take a few times more) and a short TTL.
+    GITHUB_JSON_CACHE_SIZE: int = int(os.getenv("GITHUB_JSON_CACHE_SIZE", "1000"))
+    GITHUB_JSON_CACHE_MAX_BYTES: int = int(
+        os.getenv("GITHUB_JSON_CACHE_MAX_BYTES", str(16 * 1024 * 1024))
+    )
+    GITHUB_JSON_CACHE_TTL_SECONDS: int = int(
+        os.getenv("GITHUB_JSON_CACHE_TTL_SECONDS", "300")
+    )
+    GITHUB_GRAPHQL_ENABLED: bool = (
+        os.getenv("GITHUB_GRAPHQL_ENABLED", "true").lower() == "true"
+    )
+    # Upper bound on nodes a single batched GraphQL query may request
+    GITHUB_GRAPHQL_NODE_BUDGET: int = int(os.getenv("GITHUB_GRAPHQL_NODE_BUDGET", "2000"))
+    GITHUB_GRAPHQL_MAX_ALIASES: int = int(os.getenv("GITHUB_GRAPHQL_MAX_ALIASES", "50"))
+    # Per-token pacing. The bucket guards GitHub's secondary limits (900
+    # points/min, 100 concurrent); the hourly quota is read from headers.
+    GITHUB_REQUESTS_PER_SECOND: float = float(
+        os.getenv("GITHUB_REQUESTS_PER_SECOND", "15")
+    )
+    GITHUB_REQUEST_BURST: int = int(os.getenv("GITHUB_REQUEST_BURST", "100"))
+    # Below this fraction of X-RateLimit-Limit, requests are spread over the
+    # time left until X-RateLimit-Reset
+    GITHUB_RATE_LIMIT_PACE_BELOW: float = float(
+        os.getenv("GITHUB_RATE_LIMIT_PACE_BELOW", "0.2")
+    )
+    GITHUB_RATE_LIMIT_BACKGROUND_RESERVE: int = int(
+        os.getenv("GITHUB_RATE_LIMIT_BACKGROUND_RESERVE", "500")
+    )
+    # Only enforced while pacing by the reported quota
+    GITHUB_RATE_LIMIT_INTERACTIVE_MAX_WAIT_SECONDS: float = float(
+        os.getenv("GITHUB_RATE_LIMIT_INTERACTIVE_MAX_WAIT_SECONDS", "1")
+    )
+    GITHUB_RATE_LIMIT_BACKGROUND_MAX_WAIT_SECONDS: float = float(
+        os.getenv("GITHUB_RATE_LIMIT_BACKGROUND_MAX_WAIT_SECONDS", "60")
+    )
+
+    # Background repository metadata refresh
+    REPO_REFRESH_ENABLED: bool = os.getenv("REPO_REFRESH_ENABLED", "true").lower() == "true"
+    REPO_REFRESH_INTERVAL_SECONDS: float = float(
+        os.getenv("REPO_REFRESH_INTERVAL_SECONDS", "300")
+    )
+    REPO_REFRESH_BATCH_SIZE: int = int(os.getenv("REPO_REFRESH_BATCH_SIZE", "100"))
+    REPO_STALE_AFTER_SECONDS: float = float(os.getenv("REPO_STALE_AFTER_SECONDS", "21600"))
+
+    # Commit enrichment (push events -> code_changes)
+    COMMIT_ENRICHMENT_ENABLED: bool = (
+        os.getenv("COMMIT_ENRICHMENT_ENABLED", "true").lower() == "true"
+    )
+    COMMIT_ENRICHMENT_QUEUE_SIZE: int = int(
+        os.getenv("COMMIT_ENRICHMENT_QUEUE_SIZE", "10000")
+    )
+    COMMIT_ENRICHMENT_BATCH_SIZE: int = int(os.getenv("COMMIT_ENRICHMENT_BATCH_SIZE", "50"))
+    # Webhook push payloads list at most 20 commits
+    COMMIT_ENRICHMENT_MAX_COMMITS: int = int(
+        os.getenv("COMMIT_ENRICHMENT_MAX_COMMITS", "20")
+    )
+    COMMIT_PATCH_MAX_BYTES: int = int(os.getenv("COMMIT_PATCH_MAX_BYTES", "200000"))
+    # Periodic pass over recent push events that have no code_changes yet
+    COMMIT_ENRICHMENT_SWEEP_INTERVAL_SECONDS: float = float(
+        os.getenv("COMMIT_ENRICHMENT_SWEEP_INTERVAL_SECONDS", "600")
+    )
+    COMMIT_ENRICHMENT_SWEEP_LOOKBACK_HOURS: float = float(
+        os.getenv("COMMIT_ENRICHMENT_SWEEP_LOOKBACK_HOURS", "24")
+    )
+    COMMIT_ENRICHMENT_SWEEP_BATCH_SIZE: int = int(
+        os.getenv("COMMIT_ENRICHMENT_SWEEP_BATCH_SIZE", "500")
+    )
+
+    # Event payload storage
+    JSON_CODEC: str = os.getenv("JSON_CODEC", "auto")
+    PAYLOAD_SLIMMING: bool = os.getenv("PAYLOAD_SLIMMING", "true").lower() == "true"
+    PAYLOAD_COMPRESSION_LEVEL: int = int(os.getenv("PAYLOAD_COMPRESSION_LEVEL", "1"))
+
+    # Event export
+    EVENTS_EXPORT_BATCH_SIZE: int = int(os.getenv("EVENTS_EXPORT_BATCH_SIZE", "1000"))
+    EVENTS_EXPORT_GZIP_LEVEL: int = int(os.getenv("EVENTS_EXPORT_GZIP_LEVEL", "6"))
 
     # xAI Grok API
     XAI_API_KEY: str = os.getenv("XAI_API_KEY")
@@ -1,16 +1,189 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import asyncio
+import time
+from typing import Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.api.core.config import settings
+from app.api.utils import codec
 import redis.asyncio as redis
 
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ["role"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS",
+    ["role"],
+)
+DB_POOL_OVERFLOW_OPENED = Counter(
+    "db_pool_overflow_connections_opened_total",
+    "Connections opened beyond DB_POOL_SIZE",
+    ["role"],
+)
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use", "Database connections checked out", ["role"]
+)
+DB_POOL_IDLE = Gauge(
+    "db_pool_connections_idle", "Database connections idle in the pool", ["role"]
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections", "Open connections beyond DB_POOL_SIZE", ["role"]
+)
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds", "Replication lag last measured on the read replica"
+)
+DB_READ_SESSIONS = Counter(
+    "db_read_sessions_total", "Sessions opened for read-only endpoints", ["target"]
+)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that reports how long callers wait for a connection."""
+
+    role = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(self.role).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(self.role).observe(time.perf_counter() - started)
+
+
+class ReplicaPool(InstrumentedPool):
+    role = "replica"
+
+
+def _create_engine(url: str, poolclass: type) -> AsyncEngine:
+    """Creates an engine with the pool settings and metrics shared by every database."""
+    engine = create_async_engine(
+        url,
+        echo=settings.DB_ECHO,
+        poolclass=poolclass,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+        json_serializer=codec.dumps_str,
+        json_deserializer=codec.loads,
+    )
+
+    role = poolclass.role
+    DB_POOL_IN_USE.labels(role).set_function(lambda: engine.pool.checkedout())
+    DB_POOL_IDLE.labels(role).set_function(lambda: engine.pool.checkedin())
+    DB_POOL_OVERFLOW.labels(role).set_function(lambda: max(engine.pool.overflow(), 0))
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _count_overflow_connection(dbapi_connection, connection_record):
+        # The pool counts the new connection before opening it
+        if engine.pool.overflow() > 0:
+            DB_POOL_OVERFLOW_OPENED.labels(role).inc()
+
+    return engine
+
+
 # PostgreSQL
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+engine = _create_engine(settings.DATABASE_URL, InstrumentedPool)
 
 # ✅  new alias both FastAPI and Celery can use
 AsyncSessionLocal = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+# Optional read replica
+replica_engine: Optional[AsyncEngine] = (
+    _create_engine(settings.DATABASE_REPLICA_URL, ReplicaPool)
+    if settings.DATABASE_REPLICA_URL
+    else None
+)
+ReplicaSessionLocal = (
+    async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine is not None
+    else None
+)
+
+
+class ReplicaLagMonitor:
+    """
+    Decides whether the replica may serve reads. Replication lag is measured
+    at most once per `check_interval`; a lagging or unreachable replica is
+    skipped until a later check finds it healthy again.
+    """
+
+    # Zero while the replica has replayed everything it received, so an idle
+    # primary does not read as lag
+    LAG_QUERY = text(
+        "SELECT CASE"
+        " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+        " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+        " END"
+    )
+
+    def __init__(self, engine: AsyncEngine, max_lag: float, check_interval: float):
+        self.engine = engine
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._usable = False
+        self._checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return (
+            self._checked_at is not None
+            and time.monotonic() - self._checked_at < self.check_interval
+        )
+
+    async def usable(self) -> bool:
+        if self._fresh():
+            return self._usable
+        async with self._lock:
+            if not self._fresh():
+                self._usable = await self._check()
+                self._checked_at = time.monotonic()
+        return self._usable
+
+    async def _check(self) -> bool:
+        try:
+            async with self.engine.connect() as connection:
+                lag = float(await connection.scalar(self.LAG_QUERY) or 0)
+        except Exception as e:
+            print(f"Warning: read replica unavailable, reading from primary: {e}")
+            return False
+        DB_REPLICA_LAG.set(lag)
+        if lag > self.max_lag:
+            print(f"Warning: read replica {lag:.1f}s behind, reading from primary")
+            return False
+        return True
+
+
+replica_monitor = (
+    ReplicaLagMonitor(
+        replica_engine,
+        max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+        check_interval=settings.DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+    )
+    if replica_engine is not None
+    else None
+)
+
 # Redis
 redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
 
@@ -20,5 +193,27 @@ async def get_db_session():
         yield session
 
 
+async def read_sessionmaker() -> async_sessionmaker:
+    """
+    Session factory for read-only work: the replica while it is within
+    DB_REPLICA_MAX_LAG_SECONDS of the primary, the primary otherwise.
+    """
+    if replica_monitor is not None and await replica_monitor.usable():
+        DB_READ_SESSIONS.labels("replica").inc()
+        return ReplicaSessionLocal
+    DB_READ_SESSIONS.labels("primary").inc()
+    return AsyncSessionLocal
+
+
+async def get_read_session():
+    """
+    Session dependency for endpoints that never write. Results may trail
+    the primary by up to DB_REPLICA_MAX_LAG_SECONDS.
+    """
+    session_factory = await read_sessionmaker()
+    async with session_factory() as session:
+        yield session
+
+
 async def get_redis_client():
     yield redis_client
@@ -0,0 +1,292 @@
+import functools
+import hashlib
+from typing import Any, Optional
+
+import httpx
+from prometheus_client import Counter
+
+from app.api.core.cache import TTLCache
+from app.api.core.config import settings
+from app.api.core.database import redis_client
+from app.api.core.ratelimit import INTERACTIVE, rate_limit_scheduler
+from app.api.utils import codec
+
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_WEB_URL = "https://github.com"
+
+GITHUB_REQUESTS = Counter(
+    "github_http_requests_total", "Requests sent to GitHub", ["host"]
+)
+GITHUB_CONNECTIONS_OPENED = Counter(
+    "github_http_connections_opened_total",
+    "New TCP connections opened to GitHub; requests minus these were served on reused connections",
+    ["host"],
+)
+GITHUB_CACHE_LOOKUPS = Counter(
+    "github_http_cache_lookups_total",
+    "Conditional-request cache outcomes for GitHub GETs",
+    ["result"],
+)
+GITHUB_RATE_LIMIT_SAVED = Counter(
+    "github_http_cache_rate_limit_saved_total",
+    "GitHub requests answered 304 Not Modified, which do not count against the rate limit",
+)
+
+# Headers that describe the 304 itself rather than the cached body
+_NOT_MODIFIED_DROP_HEADERS = {
+    "content-length",
+    "content-encoding",
+    "content-type",
+    "transfer-encoding",
+}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _token_key(access_token: str) -> str:
+    """Stable identifier for a token that can be stored or logged without leaking it."""
+    return hashlib.sha256(access_token.encode()).hexdigest()[:32]
+
+
+class GitHubClient:
+    """
+    Application-scoped client for GitHub's REST API and OAuth endpoints.
+
+    Wraps a single `httpx.AsyncClient` with keep-alive pooling, default
+    headers and timeouts. Each GitHub host gets its own connection pool and
+    limits. Created and closed by the app lifespan.
+
+    Requests made with a token are paced per token by the rate-limit
+    scheduler, which raises `GitHubRateLimited` rather than sending a request
+    GitHub would refuse. GETs are revalidated against a Redis cache of ETag / Last-Modified and
+    body per (token, URL). A 304 is returned to callers as a 200 carrying the
+    cached body; `json()` then reuses the already-parsed value.
+    """
+
+    def __init__(self, cache_prefix: str = "adme:github:http:"):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.cache_prefix = cache_prefix
+        # Parsed bodies keyed by (cache key, validator), so a 304 skips decoding
+        self._parsed = TTLCache(
+            "github_json",
+            maxsize=settings.GITHUB_JSON_CACHE_SIZE,
+            ttl=settings.GITHUB_JSON_CACHE_TTL_SECONDS,
+            maxweight=settings.GITHUB_JSON_CACHE_MAX_BYTES,
+        )
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+
+        http2 = settings.GITHUB_HTTP2
+        if http2 and not _http2_available():
+            print("Warning: GITHUB_HTTP2 is set but the 'h2' package is not installed")
+            http2 = False
+
+        def transport(max_connections: int) -> httpx.AsyncHTTPTransport:
+            return httpx.AsyncHTTPTransport(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=settings.GITHUB_KEEPALIVE_EXPIRY_SECONDS,
+                ),
+            )
+
+        self._client = httpx.AsyncClient(
+            base_url=GITHUB_API_URL,
+            headers={
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28",
+                "User-Agent": "adme-server",
+            },
+            timeout=httpx.Timeout(
+                settings.GITHUB_TIMEOUT_SECONDS,
+                connect=settings.GITHUB_CONNECT_TIMEOUT_SECONDS,
+            ),
+            mounts={
+                GITHUB_API_URL: transport(settings.GITHUB_API_MAX_CONNECTIONS),
+                GITHUB_WEB_URL: transport(settings.GITHUB_WEB_MAX_CONNECTIONS),
+            },
+            event_hooks={"request": [self._instrument_request]},
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError("GitHub client used before app startup")
+        return self._client
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        access_token: Optional[str] = None,
+        headers: Optional[dict] = None,
+        priority: str = INTERACTIVE,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Sends a request on the shared pool. `url` may be an API path such as
+        "/user" or an absolute URL on another GitHub host. `priority` is
+        "interactive" for requests a user is waiting on, "background" otherwise.
+        """
+        request_headers = dict(headers or {})
+        if access_token:
+            request_headers["Authorization"] = f"Bearer {access_token}"
+        request = self.client.build_request(method, url, headers=request_headers, **kwargs)
+
+        if method != "GET" or not settings.GITHUB_HTTP_CACHE:
+            return await self._send(request, access_token, priority)
+
+        cache_key = self._cache_key(request.url, access_token)
+        entry = await self._load_entry(cache_key)
+        if entry:
+            if entry.get("etag"):
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = await self._send(request, access_token, priority)
+
+        if response.status_code == 304 and entry:
+            GITHUB_CACHE_LOOKUPS.labels("not_modified").inc()
+            GITHUB_RATE_LIMIT_SAVED.inc()
+            return self._cached_response(response, cache_key, entry)
+
+        GITHUB_CACHE_LOOKUPS.labels("modified" if entry else "miss").inc()
+        if response.status_code == 200:
+            await self._store_entry(cache_key, response)
+        return response
+
+    async def _send(
+        self, request: httpx.Request, access_token: Optional[str], priority: str
+    ) -> httpx.Response:
+        if not access_token:
+            return await self.client.send(request)
+        token_key = _token_key(access_token)
+        if request.url.path == "/graphql":
+            # GraphQL has its own point-based quota, reported in the same headers
+            token_key = f"{token_key}:graphql"
+        await rate_limit_scheduler.acquire(token_key, priority)
+        response = await self.client.send(request)
+        rate_limit_scheduler.observe(token_key, response)
+        return response
+
+    def json(self, response: httpx.Response) -> Any:
+        """
+        Decodes a response body. Bodies served from the conditional cache are
+        decoded once per validator and shared, so treat the result as read-only.
+        """
+        validator = response.extensions.get("github_cache_validator")
+        if validator is None:
+            return codec.loads(response.content)
+        data = self._parsed.get(validator)
+        if data is None:
+            data = codec.loads(response.content)
+            self._parsed.set(validator, data, weight=len(response.content))
+        return data
+
+    def _cache_key(self, url: httpx.URL, access_token: Optional[str]) -> str:
+        # Responses differ per token (private repos, /user)
+        token = _token_key(access_token) if access_token else "anonymous"
+        return f"{self.cache_prefix}{token}:{url}"
+
+    async def _load_entry(self, cache_key: str) -> Optional[dict]:
+        try:
+            entry = await redis_client.hgetall(cache_key)
+        except Exception as e:
+            print(f"Warning: GitHub response cache unavailable: {e}")
+            GITHUB_CACHE_LOOKUPS.labels("unavailable").inc()
+            return None
+        # Entries stored before "link" was kept cannot restore pagination
+        if not entry or "body" not in entry or "link" not in entry:
+            return None
+        return entry
+
+    async def _store_entry(self, cache_key: str, response: httpx.Response) -> None:
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not (etag or last_modified):
+            return
+        if len(response.content) > settings.GITHUB_HTTP_CACHE_MAX_BODY_BYTES:
+            return
+
+        entry = {
+            "etag": etag or "",
+            "last_modified": last_modified or "",
+            "content_type": response.headers.get("Content-Type", "application/json"),
+            # Pagination; a 304 need not repeat it
+            "link": response.headers.get("Link", ""),
+            "body": response.text,
+        }
+        try:
+            async with redis_client.pipeline(transaction=False) as pipe:
+                pipe.hset(cache_key, mapping=entry)
+                pipe.expire(cache_key, settings.GITHUB_HTTP_CACHE_TTL_SECONDS)
+                await pipe.execute()
+        except Exception as e:
+            print(f"Warning: failed to cache GitHub response: {e}")
+            return
+        response.extensions["github_cache_validator"] = (cache_key, etag or last_modified)
+
+    @staticmethod
+    def _cached_response(
+        not_modified: httpx.Response, cache_key: str, entry: dict
+    ) -> httpx.Response:
+        # Keep the 304's own headers (rate-limit counters, dates) but describe
+        # the cached body.
+        headers = [
+            (name, value)
+            for name, value in not_modified.headers.multi_items()
+            if name.lower() not in _NOT_MODIFIED_DROP_HEADERS
+        ]
+        headers.append(("Content-Type", entry.get("content_type") or "application/json"))
+        if entry.get("link") and "Link" not in not_modified.headers:
+            headers.append(("Link", entry["link"]))
+        headers.append(("X-Adme-Cache", "not-modified"))
+        return httpx.Response(
+            200,
+            headers=headers,
+            content=entry["body"].encode(),
+            request=not_modified.request,
+            extensions={
+                "github_cache_validator": (
+                    cache_key,
+                    entry.get("etag") or entry.get("last_modified"),
+                )
+            },
+        )
+
+    async def get(self, url: str, access_token: Optional[str] = None, **kwargs):
+        return await self.request("GET", url, access_token, **kwargs)
+
+    async def post(self, url: str, access_token: Optional[str] = None, **kwargs):
+        return await self.request("POST", url, access_token, **kwargs)
+
+    async def delete(self, url: str, access_token: Optional[str] = None, **kwargs):
+        return await self.request("DELETE", url, access_token, **kwargs)
+
+    async def _instrument_request(self, request: httpx.Request) -> None:
+        host = request.url.host
+        GITHUB_REQUESTS.labels(host).inc()
+        request.extensions["trace"] = functools.partial(self._trace, host)
+
+    @staticmethod
+    async def _trace(host: str, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            GITHUB_CONNECTIONS_OPENED.labels(host).inc()
+
+
+github_client = GitHubClient()
@@ -0,0 +1,233 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+from prometheus_client import Counter, Histogram
+
+from app.api.core.config import settings
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+RATE_LIMIT_REJECTIONS = Counter(
+    "github_rate_limit_rejections_total",
+    "GitHub requests refused locally before being sent",
+    ["priority", "reason"],
+)
+RATE_LIMIT_WAIT = Histogram(
+    "github_rate_limit_wait_seconds",
+    "Time a GitHub request waited for the per-token token bucket",
+    ["priority"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+RATE_LIMIT_HITS = Counter(
+    "github_rate_limit_responses_total",
+    "Rate-limited responses received from GitHub",
+    ["kind"],
+)
+
+
+class GitHubRateLimited(Exception):
+    """
+    Raised instead of sending a request that GitHub would refuse. The app maps
+    it to 429 with `Retry-After`.
+    """
+
+    def __init__(self, retry_after: float, reason: str = "rate_limited"):
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+        super().__init__(f"GitHub rate limit ({reason}); retry after {self.retry_after}s")
+
+
+@dataclass
+class _TokenState:
+    tokens: float
+    updated_at: float
+    # Primary quota as last reported by GitHub; reset_at is a wall-clock epoch
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset_at: float = 0.0
+    # Monotonic deadline set by Retry-After / secondary limits
+    blocked_until: float = 0.0
+    waiters: dict = field(default_factory=lambda: {INTERACTIVE: 0, BACKGROUND: 0})
+
+
+class RateLimitScheduler:
+    """
+    Per-token pacing for GitHub requests.
+
+    Remaining quota, reset time and secondary-limit back-off are learned from
+    response headers (`X-RateLimit-*`, `Retry-After`, 403/429); requests that
+    GitHub would refuse are not sent.
+
+    Each token has a token bucket with room for `burst`. While the reported
+    quota is ample (or unknown) it refills at `rate` requests per second, which
+    only guards GitHub's secondary limits, and interactive requests simply wait
+    for it. Once less than `pace_below` of the limit remains, the refill rate
+    drops to spread what is left over the time until reset; interactive
+    requests then wait up to `interactive_max_wait` and otherwise fail fast
+    with a predicted retry-after.
+
+    Background requests wait up to `background_max_wait`, yield to queued
+    interactive requests and stop while less than `background_reserve` of the
+    quota remains, keeping it for interactive use.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        background_reserve: int,
+        interactive_max_wait: float,
+        background_max_wait: float,
+        pace_below: float = 0.2,
+        max_tokens_tracked: int = 10000,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.background_reserve = background_reserve
+        self.max_wait = {
+            INTERACTIVE: interactive_max_wait,
+            BACKGROUND: background_max_wait,
+        }
+        self.pace_below = pace_below
+        self.max_tokens_tracked = max_tokens_tracked
+        self._states: "OrderedDict[str, _TokenState]" = OrderedDict()
+
+    def _state(self, key: str) -> _TokenState:
+        state = self._states.get(key)
+        if state is None:
+            state = _TokenState(tokens=self.burst, updated_at=time.monotonic())
+            self._states[key] = state
+            while len(self._states) > self.max_tokens_tracked:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(key)
+        return state
+
+    def _quota_rate(self, state: _TokenState, priority: str) -> Optional[float]:
+        """
+        The rate that spreads the remaining quota over the time left until
+        reset, or None while the quota is ample or unknown.
+        """
+        if state.remaining is None or not state.limit:
+            return None
+        if state.remaining >= self.pace_below * state.limit:
+            return None
+        seconds_to_reset = state.reset_at - time.time()
+        if seconds_to_reset <= 0:
+            return None
+        floor = self.background_reserve if priority == BACKGROUND else 0
+        return max((state.remaining - floor) / seconds_to_reset, 0.01)
+
+    def _refill(self, state: _TokenState, now: float, rate: float) -> None:
+        elapsed = now - state.updated_at
+        state.tokens = min(self.burst, state.tokens + elapsed * rate)
+        state.updated_at = now
+
+    def _check_quota(self, state: _TokenState, priority: str) -> None:
+        now = time.monotonic()
+        if state.blocked_until > now:
+            RATE_LIMIT_REJECTIONS.labels(priority, "secondary").inc()
+            raise GitHubRateLimited(state.blocked_until - now, "secondary")
+
+        if state.remaining is None:
+            return
+        seconds_to_reset = state.reset_at - time.time()
+        if seconds_to_reset <= 0:
+            # Window rolled over; the next response will report the new quota
+            state.remaining = None
+            return
+        floor = self.background_reserve if priority == BACKGROUND else 0
+        if state.remaining <= floor:
+            reason = "reserved" if state.remaining > 0 else "exhausted"
+            RATE_LIMIT_REJECTIONS.labels(priority, reason).inc()
+            raise GitHubRateLimited(seconds_to_reset, reason)
+
+    async def acquire(self, key: str, priority: str = INTERACTIVE) -> None:
+        """
+        Waits for a slot to send one request for the token identified by
+        `key`, or raises `GitHubRateLimited` if that would take too long.
+        """
+        state = self._state(key)
+        waited = 0.0
+        while True:
+            self._check_quota(state, priority)
+
+            quota_rate = self._quota_rate(state, priority)
+            rate = self.rate if quota_rate is None else min(self.rate, quota_rate)
+            now = time.monotonic()
+            self._refill(state, now, rate)
+            # Background requests leave the bucket to queued interactive ones
+            yield_to_interactive = priority == BACKGROUND and state.waiters[INTERACTIVE]
+            if state.tokens >= 1 and not yield_to_interactive:
+                state.tokens -= 1
+                if state.remaining is not None:
+                    state.remaining -= 1
+                RATE_LIMIT_WAIT.labels(priority).observe(waited)
+                return
+
+            delay = max((1 - state.tokens) / rate, 0.01)
+            # With ample quota an interactive request only waits out the
+            # secondary-limit guard, however large the fan-out
+            bounded = priority == BACKGROUND or quota_rate is not None
+            if bounded and waited + delay > self.max_wait[priority]:
+                RATE_LIMIT_REJECTIONS.labels(priority, "paced").inc()
+                raise GitHubRateLimited(waited + delay, "paced")
+
+            state.waiters[priority] += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                state.waiters[priority] -= 1
+            waited += delay
+
+    def observe(self, key: str, response: httpx.Response) -> None:
+        """Updates the token's quota from the headers of a GitHub response."""
+        state = self._state(key)
+        headers = response.headers
+
+        try:
+            if "X-RateLimit-Remaining" in headers:
+                state.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Limit" in headers:
+                state.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Reset" in headers:
+                state.reset_at = float(headers["X-RateLimit-Reset"])
+        except ValueError:
+            pass
+
+        if response.status_code not in (403, 429):
+            return
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                delay = 60.0
+        elif state.remaining == 0:
+            # Primary quota exhausted; _check_quota holds requests until reset
+            RATE_LIMIT_HITS.labels("primary").inc()
+            return
+        elif response.status_code == 429 or "rate limit" in response.text.lower():
+            # Secondary limit without Retry-After: GitHub asks for at least a minute
+            delay = 60.0
+        else:
+            # An ordinary 403 (permissions), not a rate limit
+            return
+        state.blocked_until = time.monotonic() + delay
+        RATE_LIMIT_HITS.labels("secondary").inc()
+
+
+rate_limit_scheduler = RateLimitScheduler(
+    rate=settings.GITHUB_REQUESTS_PER_SECOND,
+    burst=settings.GITHUB_REQUEST_BURST,
+    background_reserve=settings.GITHUB_RATE_LIMIT_BACKGROUND_RESERVE,
+    interactive_max_wait=settings.GITHUB_RATE_LIMIT_INTERACTIVE_MAX_WAIT_SECONDS,
+    background_max_wait=settings.GITHUB_RATE_LIMIT_BACKGROUND_MAX_WAIT_SECONDS,
+    pace_below=settings.GITHUB_RATE_LIMIT_PACE_BELOW,
+)
@@ -1,10 +1,15 @@
+import asyncio
 import hmac
 import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.fernet import Fernet
 from app.api.core.config import settings
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, Tuple, TypeVar
 from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge, Histogram
 from jose import JWTError, jwt
 
 from app.api.core.config import settings
@@ -26,7 +31,122 @@ def verify_webhook_signature(payload: bytes, signature: str, secret: str) -> boo
     return hmac.compare_digest(f"sha256={expected_signature}", signature)
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+class WebhookSignatureVerifier:
+    """
+    Computes a GitHub webhook HMAC-SHA256 incrementally, so the signature can
+    be checked as the request body streams in instead of after buffering it.
+    """
+
+    def __init__(self, secret: str):
+        self._mac = hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+    def update(self, chunk: bytes) -> None:
+        self._mac.update(chunk)
+
+    def verify(self, signature: Optional[str]) -> bool:
+        """Checks an `X-Hub-Signature-256` value ("sha256=<hex>") against the digest."""
+        if not signature:
+            return False
+        sha_name, _, signature_hash = signature.partition("=")
+        if sha_name != "sha256":
+            return False
+        return hmac.compare_digest(self._mac.hexdigest(), signature_hash)
+
+
+# Hashes with outdated settings (e.g. fewer rounds) are re-hashed on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS
+)
+
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_seconds",
+    "Time spent in bcrypt, excluding time queued for a worker",
+    ["operation"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2),
+)
+PASSWORD_HASH_QUEUE_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Time password jobs waited for a hashing thread",
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "Password jobs refused because the queue was full"
+)
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending", "Password jobs running or waiting for a hashing thread"
+)
+
+T = TypeVar("T")
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when too many password hashes are already queued; served as 503."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool so it never blocks the event
+    loop. At most `max_pending` jobs may be running or queued; beyond that,
+    callers get `PasswordHashingBusy` instead of an ever-growing queue.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self.max_pending = max_pending
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        PASSWORD_HASH_PENDING.set_function(lambda: self._pending)
+
+    async def _run(self, operation: str, fn: Callable[..., T], *args) -> T:
+        if self._pending >= self.max_pending:
+            PASSWORD_HASH_REJECTED.inc()
+            raise PasswordHashingBusy("Too many password operations in progress")
+
+        submitted = time.perf_counter()
+
+        def job() -> T:
+            started = time.perf_counter()
+            PASSWORD_HASH_QUEUE_WAIT.observe(started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                PASSWORD_HASH_LATENCY.labels(operation).observe(
+                    time.perf_counter() - started
+                )
+
+        with self._pending_lock:
+            self._pending += 1
+        future = self._executor.submit(job)
+        # Released when bcrypt actually finishes (or the job is cancelled
+        # before starting), not when a disconnected caller stops waiting
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _future) -> None:
+        with self._pending_lock:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", pwd_context.hash, password)
+
+    async def verify_and_update(
+        self, plain_password: str, password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verifies a password. On success, also returns a new hash when the
+        stored one uses outdated settings (e.g. fewer rounds), else None.
+        """
+        return await self._run(
+            "verify", pwd_context.verify_and_update, plain_password, password
+        )
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
 
 # JWT settings
 SECRET_KEY = (
@@ -38,7 +158,10 @@ REFRESH_TOKEN_EXPIRE_DAYS = 7  # Refresh tokens last longer
 
 
 def hash_password(password: str) -> str:
-    """Hashes a plain text password using bcrypt."""
+    """
+    Hashes a plain text password using bcrypt. Blocks for the whole hash; use
+    `password_hasher.hash` from async code.
+    """
     return pwd_context.hash(password)
 
 
@@ -1,2 +1,6 @@
 from .auth import get_current_user  # Import the dependency to get current user
-from .db import get_db_session  # Import the database session dependency
\ No newline at end of file
+from .auth import get_current_user_id  # Claims-only variant that skips the database
+from .db import get_db_session  # Import the database session dependency
+from .db import get_read_session  # Replica session for read-only endpoints
+from .github import get_github_client  # Import the shared GitHub client dependency
+from .github import get_github_credentials  # User + GitHub token, one query per request
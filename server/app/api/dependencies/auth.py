@@ -6,22 +6,21 @@ from fastapi.security import (
     HTTPAuthorizationCredentials,
 )
 from jose import JWTError
-from sqlalchemy import select
 from app.api.core.database import AsyncSession, get_db_session
-from app.api.models import User  # Assuming your User model is in app.api.models
 from app.api.core.security import decode_token  # Import the decode_token function
+from app.services.principals import Principal, get_principal
 import uuid
 
 # OAuth2PasswordBearer is used for password flow, but HTTPBearer is more general for token extraction
 oauth2_scheme = HTTPBearer(scheme_name="Bearer")
 
 
-async def get_current_user(
+async def get_current_user_id(
     credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db_session),
-) -> User:
+) -> uuid.UUID:
     """
-    Dependency to get the current authenticated user from the access token.
+    Claims-only dependency: verifies the access token and returns its user ID
+    without touching the database. Use it for endpoints that only need the id.
     """
     token = (
         credentials.credentials
@@ -37,7 +36,7 @@ async def get_current_user(
                 detail="Invalid authentication token or token type.",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        user_uuid = uuid.UUID(user_id)
+        return uuid.UUID(user_id)
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,16 +50,22 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    stmt = select(User).where(User.id == user_uuid)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
 
-    if user is None:
+async def get_current_user(
+    user_id: uuid.UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db_session),
+) -> Principal:
+    """
+    Dependency to get the current authenticated user from the access token.
+    The profile is served from the principal cache when possible.
+    """
+    principal = await get_principal(db, user_id)
+    if principal is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
-    return user
+    return principal
 
 
 # You can add more specific dependencies if needed, e.g., for requiring active users
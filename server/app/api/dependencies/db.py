@@ -1,5 +1,5 @@
 from fastapi import Depends
-from app.api.core.database import get_db_session, get_redis_client
+from app.api.core.database import get_db_session, get_read_session, get_redis_client
 from sqlalchemy.ext.asyncio import AsyncSession
 import redis.asyncio as redis
 
@@ -0,0 +1,33 @@
+import uuid
+
+from fastapi import Depends, HTTPException
+
+from app.api.core.database import AsyncSession, get_db_session
+from app.api.core.github import GitHubClient, github_client
+from app.services.github_tokens import GitHubCredentials, load_github_credentials
+
+
+async def get_github_client() -> GitHubClient:
+    """Dependency returning the app-wide pooled GitHub client."""
+    return github_client
+
+
+async def get_github_credentials(
+    user_id: str, db: AsyncSession = Depends(get_db_session)
+) -> GitHubCredentials:
+    """
+    Dependency resolving the `user_id` query parameter to the user and their
+    GitHub token in at most one query. FastAPI caches dependencies per
+    request, so every consumer within a request shares the result.
+    """
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user_id format")
+
+    credentials = await load_github_credentials(db, user_uuid)
+    if credentials is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if credentials.access_token is None:
+        raise HTTPException(status_code=404, detail="GitHub OAuth not found for user")
+    return credentials
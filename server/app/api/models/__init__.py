@@ -3,4 +3,4 @@ from .user import User, Organisation, OAuthProvider, UserOAuth, UserOrganisation
 from .repository import Repository, UserRepository
 from .github import GitHubEvents, CodeChanges
 from .content import Summaries, Posts, ResumeBullets, PostTemplates
-from .webhooks import Webhook
\ No newline at end of file
+from .webhooks import Webhook, WebhookDelivery
\ No newline at end of file
@@ -3,7 +3,7 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 from typing import Optional, TYPE_CHECKING
-from sqlalchemy import ForeignKeyConstraint, ForeignKey, Text, text
+from sqlalchemy import ForeignKeyConstraint, ForeignKey, Index, LargeBinary, Text, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -30,8 +30,16 @@ class GitHubEvents(Base):
         ForeignKey("repositories.id", ondelete="CASCADE")
     )
     event_type: Mapped[str]
-    event_id_gh: Mapped[int] = mapped_column(unique=True)
+    # ID from the GitHub events API; webhook deliveries are keyed by delivery_id instead
+    event_id_gh: Mapped[Optional[int]] = mapped_column(nullable=True)
+    delivery_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True), nullable=True
+    )
+    # Essential per-event-type projection; the full payload lives in payload_raw
     payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    payload_raw: Mapped[Optional[bytes]] = mapped_column(
+        LargeBinary, nullable=True, deferred=True
+    )
     processed: Mapped[bool] = mapped_column(server_default=text("false"))
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
 
@@ -49,6 +57,18 @@ class GitHubEvents(Base):
         cascade="all, delete-orphan",  # ← orphan cleanup here
     )
 
+    __table_args__ = (
+        # Unique indexes on the hypertable must include the partition column
+        Index(
+            "uq_github_events_event_id_gh", "event_id_gh", "occurred_at", unique=True
+        ),
+        Index(
+            "idx_github_events_delivery_id",
+            "delivery_id",
+            postgresql_where=text("delivery_id IS NOT NULL"),
+        ),
+    )
+
 
 class CodeChanges(Base):
     __tablename__ = "code_changes"
@@ -69,6 +89,7 @@ class CodeChanges(Base):
             ["github_events.id", "github_events.occurred_at"],
             ondelete="CASCADE",
         ),
+        Index("uq_code_changes_event_sha", "event_id", "sha", unique=True),
     )
 
     event: Mapped["GitHubEvents"] = relationship(
@@ -35,6 +35,8 @@ class Repository(Base):
     created_at_gh: Mapped[Optional[datetime]]
     updated_at_gh: Mapped[Optional[datetime]]
     pushed_at_gh: Mapped[Optional[datetime]]
+    # Last revalidation against GitHub; see services/repository_refresher.py
+    refreshed_at: Mapped[Optional[datetime]]
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
         server_default=func.now(), onupdate=func.now()
@@ -3,7 +3,7 @@ from __future__ import annotations
 import uuid
 from datetime import datetime
 from typing import List, Optional, TYPE_CHECKING
-from sqlalchemy import ForeignKey, Text, text
+from sqlalchemy import ForeignKey, Index, Text, text
 from sqlalchemy.dialects.postgresql import UUID, BIGINT, ARRAY
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -46,6 +46,9 @@ class Webhook(Base):
     # The secret used to sign webhook payloads from GitHub
     secret: Mapped[str] = mapped_column(Text, nullable=False)
 
+    # Opaque token embedded in the delivery URL that routes deliveries to this webhook
+    route_token: Mapped[Optional[str]] = mapped_column(Text, unique=True, nullable=True)
+
     # A list of event types the webhook is subscribed to (e.g., ["push", "pull_request"])
     events: Mapped[List[str]] = mapped_column(ARRAY(Text), nullable=False)
 
@@ -65,3 +68,19 @@ class Webhook(Base):
     user: Mapped["User"] = relationship(back_populates="webhooks")
     # Relationship to the Repository model
     repository: Mapped["Repository"] = relationship(back_populates="webhooks")
+
+
+class WebhookDelivery(Base):
+    """
+    Ledger of GitHub webhook deliveries already accepted, keyed by the full
+    `X-GitHub-Delivery` GUID.
+    """
+
+    __tablename__ = "webhook_deliveries"
+
+    delivery_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    received_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    __table_args__ = (
+        Index("idx_webhook_deliveries_received_at", "received_at"),
+    )
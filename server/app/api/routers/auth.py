@@ -3,24 +3,26 @@ from fastapi.responses import RedirectResponse
 from jose import JWTError
 from pydantic import BaseModel, EmailStr, Field, validator
 from app.api.core.config import settings
-from app.api.core.database import AsyncSession, get_db_session
-from app.api.models import User, UserOAuth, OAuthProvider
+from app.api.core.database import AsyncSession, get_db_session, get_read_session
+from app.api.models import User
 from app.api.core.security import (
-    hash_password,
-    verify_password,
+    password_hasher,
     create_access_token,
     create_refresh_token,
     decode_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     REFRESH_TOKEN_EXPIRE_DAYS,
-    encrypt_token,
 )
+from app.api.core.github import GITHUB_WEB_URL, GitHubClient
 from app.api.dependencies.auth import get_current_user
+from app.api.dependencies.github import get_github_client
+from app.services.accounts import ensure_oauth_providers, upsert_oauth_user
+from app.services.github_tokens import invalidate_github_token
+from app.services.principals import Principal, invalidate_principal
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.sql import func
-import httpx
 from datetime import timedelta
+import asyncio
 import uuid
 from typing import List, Optional
 import datetime
@@ -73,19 +75,6 @@ class UserLogin(BaseModel):
 # --- Helper Functions ---
 
 
-async def ensure_github_provider(db: AsyncSession):
-    stmt = select(OAuthProvider).where(OAuthProvider.provider == "github")
-    result = await db.execute(stmt)
-    provider = result.scalar_one_or_none()
-    if not provider:
-        provider = OAuthProvider(provider="github", issuer_url="https://github.com")
-        db.add(provider)
-        try:
-            await db.commit()
-        except IntegrityError:
-            await db.rollback()
-
-
 # --- Authentication Endpoints ---
 
 
@@ -107,11 +96,11 @@ async def signup_email_password(
             detail="User with this email already exists.",
         )
 
-    hashed_password = hash_password(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
 
     new_user = User(
         email=user_data.email,
-        hashed_password=hashed_password,
+        password=hashed_password,
         full_name=user_data.full_name,
         avatar_url=None,
     )
@@ -147,16 +136,21 @@ async def login_email_password(
     result = await db.execute(stmt)
     user = result.scalar_one_or_none()
 
-    if (
-        not user
-        or not user.hashed_password
-        or not verify_password(user_login.password, user.hashed_password)
-    ):
+    verified, new_hash = False, None
+    if user and user.password:
+        verified, new_hash = await password_hasher.verify_and_update(
+            user_login.password, user.password
+        )
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Stored hash predates the current BCRYPT_ROUNDS; upgrade it in place
+        user.password = new_hash
+        await db.commit()
 
     access_token = create_access_token(data={"user_id": str(user.id)})
     refresh_token = create_refresh_token(data={"user_id": str(user.id)})
@@ -186,7 +180,11 @@ async def login_github():
 
 @router.get("/oauth/github/callback", response_model=LoginSuccessResponse)
 async def github_callback(
-    request: Request, code: str, state: str, db: AsyncSession = Depends(get_db_session)
+    request: Request,
+    code: str,
+    state: str,
+    db: AsyncSession = Depends(get_db_session),
+    github: GitHubClient = Depends(get_github_client),
 ):
     """
     Handles the callback from GitHub OAuth.
@@ -197,148 +195,103 @@ async def github_callback(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid state parameter"
         )
 
-    await ensure_github_provider(db)
+    # Seeded at startup; only retried here if that failed
+    await ensure_oauth_providers()
 
     # Exchange code for access token
-    async with httpx.AsyncClient() as client:
-        token_response = await client.post(
-            "https://github.com/login/oauth/access_token",
-            data={
-                "client_id": settings.GITHUB_CLIENT_ID,
-                "client_secret": settings.GITHUB_CLIENT_SECRET,
-                "code": code,
-                "redirect_uri": settings.GITHUB_REDIRECT_URI,
-            },
-            headers={"Accept": "application/json"},
+    token_response = await github.post(
+        f"{GITHUB_WEB_URL}/login/oauth/access_token",
+        data={
+            "client_id": settings.GITHUB_CLIENT_ID,
+            "client_secret": settings.GITHUB_CLIENT_SECRET,
+            "code": code,
+            "redirect_uri": settings.GITHUB_REDIRECT_URI,
+        },
+        headers={"Accept": "application/json"},
+    )
+
+    if token_response.status_code != 200:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to get access token from GitHub: {token_response.text}",
         )
 
-        if token_response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Failed to get access token from GitHub: {token_response.text}",
-            )
+    token_data = token_response.json()
+    github_access_token = token_data.get("access_token")
+    github_refresh_token = token_data.get("refresh_token")
+    scope = token_data.get("scope", "").split(",") if token_data.get("scope") else []
+    expires_at = None  # GitHub's user access tokens often don't have a strict expiry or it's very long
 
-        token_data = token_response.json()
-        github_access_token = token_data.get("access_token")
-        github_refresh_token = token_data.get("refresh_token")
-        scope = (
-            token_data.get("scope", "").split(",") if token_data.get("scope") else []
+    if not github_access_token:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No access token received from GitHub",
         )
-        expires_at = None  # GitHub's user access tokens often don't have a strict expiry or it's very long
 
-        if not github_access_token:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No access token received from GitHub",
-            )
+    # Fetch the profile and email addresses together; the emails are only
+    # needed when the profile email is private.
+    user_info_response, emails_response = await asyncio.gather(
+        github.get("/user", github_access_token),
+        github.get("/user/emails", github_access_token),
+    )
 
-        # Fetch user info from GitHub
-        user_info_response = await client.get(
-            "https://api.github.com/user",
-            headers={"Authorization": f"Bearer {github_access_token}"},
+    if user_info_response.status_code != 200:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to get user info from GitHub: {user_info_response.text}",
         )
 
-        if user_info_response.status_code != 200:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Failed to get user info from GitHub: {user_info_response.text}",
-            )
+    user_data = github.json(user_info_response)
+    github_user_id = str(user_data.get("id"))
+    email = user_data.get("email")
+    full_name = user_data.get("name")
+    avatar_url = user_data.get("avatar_url")
 
-        user_data = user_info_response.json()
-        github_user_id = str(user_data.get("id"))
-        email = user_data.get("email")
-        full_name = user_data.get("name")
-        avatar_url = user_data.get("avatar_url")
-
-        # If email is private on GitHub, fetch from user emails endpoint
-        if not email:
-            emails_response = await client.get(
-                "https://api.github.com/user/emails",
-                headers={"Authorization": f"Bearer {github_access_token}"},
-            )
-            if emails_response.status_code != 200:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Failed to get user emails from GitHub: {emails_response.text}",
-                )
-            emails = emails_response.json()
-            primary_email = next((e["email"] for e in emails if e.get("primary")), None)
-            email = primary_email or emails[0]["email"] if emails else None
-
-        if not email:
+    # If email is private on GitHub, use the primary address from /user/emails
+    if not email:
+        if emails_response.status_code != 200:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No primary email found for GitHub user.",
+                detail=f"Failed to get user emails from GitHub: {emails_response.text}",
             )
+        emails = github.json(emails_response)
+        primary_email = next((e["email"] for e in emails if e.get("primary")), None)
+        email = primary_email or emails[0]["email"] if emails else None
 
-        # Find or Create User in our DB
-        stmt = select(User).where(User.email == email)
-        result = await db.execute(stmt)
-        user = result.scalar_one_or_none()
-
-        if not user:
-            # New user, create User record
-            user = User(
-                email=email,
-                full_name=full_name,
-                avatar_url=avatar_url,
-                hashed_password=None,  # No password for OAuth users
-            )
-            db.add(user)
-            await db.commit()
-            await db.refresh(user)
-        else:
-            # Existing user, update profile if needed
-            user.full_name = full_name
-            user.avatar_url = avatar_url
-            user.updated_at = func.now()
-            await db.commit()
-
-        # Store/Update OAuth credentials
-        encrypted_github_access_token = encrypt_token(github_access_token)
-        encrypted_github_refresh_token = (
-            encrypt_token(github_refresh_token) if github_refresh_token else None
-        )
-        stmt = select(UserOAuth).where(
-            UserOAuth.user_id == user.id, UserOAuth.provider == "github"
+    if not email:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No primary email found for GitHub user.",
         )
-        result = await db.execute(stmt)
-        user_oauth = result.scalar_one_or_none()
-
-        if not user_oauth:
-            user_oauth = UserOAuth(
-                user_id=user.id,
-                provider="github",
-                provider_uid=github_user_id,
-                access_token=encrypted_github_access_token,
-                refresh_token=encrypted_github_refresh_token,
-                scope=scope,
-                expires_at=expires_at,
-            )
-            db.add(user_oauth)
-        else:
-            user_oauth.provider_uid = github_user_id
-            user_oauth.access_token = encrypted_github_access_token
-            user_oauth.refresh_token = encrypted_github_refresh_token
-            user_oauth.scope = scope
-            user_oauth.expires_at = expires_at
-            user_oauth.created_at = (
-                func.now()
-            )  # Update created_at on re-auth for simplicity
 
-        await db.commit()
+    # Create or refresh the user and their OAuth credentials in one transaction
+    user = await upsert_oauth_user(
+        db,
+        provider="github",
+        provider_uid=github_user_id,
+        email=email,
+        full_name=full_name,
+        avatar_url=avatar_url,
+        access_token=github_access_token,
+        refresh_token=github_refresh_token,
+        scope=scope,
+        expires_at=expires_at,
+    )
+    # The profile changed and the token was rotated; drop the old copies from
+    # every worker's caches
+    await asyncio.gather(invalidate_principal(user.id), invalidate_github_token(user.id))
 
-        # Issue our application's JWT tokens
-        app_access_token = create_access_token(data={"user_id": str(user.id)})
-        app_refresh_token = create_refresh_token(data={"user_id": str(user.id)})
+    # Issue our application's JWT tokens
+    app_access_token = create_access_token(data={"user_id": str(user.id)})
+    app_refresh_token = create_refresh_token(data={"user_id": str(user.id)})
 
-        return LoginSuccessResponse(
-            message="GitHub authentication successful.",
-            user=UserProfileResponse.model_validate(user),
-            tokens=TokenResponse(
-                access_token=app_access_token, refresh_token=app_refresh_token
-            ),
-        )
+    return LoginSuccessResponse(
+        message="GitHub authentication successful.",
+        user=UserProfileResponse.model_validate(user),
+        tokens=TokenResponse(
+            access_token=app_access_token, refresh_token=app_refresh_token
+        ),
+    )
 
 
 @router.post("/token/refresh", response_model=TokenResponse)
@@ -402,7 +355,7 @@ async def refresh_access_token(
 
 
 @router.get("/users/all", response_model=List[UserProfileResponse])
-async def get_all_users(db: AsyncSession = Depends(get_db_session)):
+async def get_all_users(db: AsyncSession = Depends(get_read_session)):
     """
     Retrieves a list of all users.
     NOTE: This endpoint should be protected and restricted to admin users in a production environment.
@@ -414,7 +367,9 @@ async def get_all_users(db: AsyncSession = Depends(get_db_session)):
 
 
 @router.get("/me", response_model=UserProfileResponse)
-async def get_current_user_profile(current_user: User = Depends(get_current_user)):
+async def get_current_user_profile(
+    current_user: Principal = Depends(get_current_user),
+):
     """
     Retrieves the profile of the currently authenticated user.
     Requires a valid access token.
@@ -1,25 +1,54 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from app.api.core.database import AsyncSession, get_db_session
-from app.api.models import User, UserOAuth, GitHubEvents, Repository
+from app.api.core.database import (
+    AsyncSession,
+    get_db_session,
+    get_read_session,
+    read_sessionmaker,
+)
+from app.api.core.github import GitHubClient
+from app.api.core.ratelimit import GitHubRateLimited
+from app.api.dependencies.github import get_github_client, get_github_credentials
+from app.api.models import User, GitHubEvents
 from app.api.core.config import settings
-from app.api.core.security import decrypt_token
-from sqlalchemy import select
-from typing import List, Optional
+from prometheus_client import Histogram
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from typing import AsyncIterator, List, Optional
 from datetime import datetime
+import base64
 import httpx
 import uuid
-import asyncio
-from app.api.utils import github_ts, model_to_dict
+import zlib
+from app.api.utils import codec, github_ts, naive_utc
+from app.api.utils.payloads import compress_payload, slim_payload
+from app.services.commit_enrichment import commit_enricher
+from app.services.github_tokens import GitHubCredentials
+from app.services.repositories import (
+    existing_repository_ids,
+    fetch_all_pages,
+    fetch_repositories,
+    insert_repositories,
+    repository_values,
+    upsert_repositories,
+)
 
 router = APIRouter()
 
+EVENTS_LAST_LATENCY = Histogram(
+    "events_last_latency_seconds",
+    "Latency of /events/last, labelled by requested page size",
+    ["page_size"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
+)
+
 
 class GitHubEventResponse(BaseModel):
     id: str
     event_type: str
     repo_id: int
-    payload: dict
+    payload: Optional[dict] = None
     occurred_at: datetime
     processed: bool
 
@@ -27,6 +56,7 @@ class GitHubEventResponse(BaseModel):
 class EventsResponse(BaseModel):
     message: str
     events: List[GitHubEventResponse]
+    next_cursor: Optional[str] = None
 
 
 class RepositoryResponse(BaseModel):
@@ -62,69 +92,40 @@ class LatestEventsRequest(BaseModel):
 
 @router.post("/latest", response_model=EventsResponse)
 async def fetch_latest_github_events(
-    user_id: str, limit: int = 10, db: AsyncSession = Depends(get_db_session)
+    limit: int = 10,
+    credentials: GitHubCredentials = Depends(get_github_credentials),
+    github: GitHubClient = Depends(get_github_client),
 ):
-    # Step 1: Validate user_id format
-    try:
-        user_uuid = uuid.UUID(user_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid user_id format")
-
-    # Step 2: Fetch user
-    stmt = select(User).where(User.id == user_uuid)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Step 3: Fetch GitHub OAuth credentials
-    stmt = select(UserOAuth).where(
-        UserOAuth.user_id == user.id, UserOAuth.provider == "github"
-    )
-    result = await db.execute(stmt)
-    user_oauth = result.scalar_one_or_none()
-    if not user_oauth:
-        raise HTTPException(status_code=404, detail="GitHub OAuth not found for user")
-    print("user oauth", model_to_dict(user_oauth))
-    access_token = decrypt_token(user_oauth.access_token)
+    # Steps 1-3: user and GitHub OAuth credentials, resolved by the dependency
+    access_token = credentials.access_token
 
     try:
-        async with httpx.AsyncClient() as client:
-            # Step 4: Get GitHub username using /user
-            user_resp = await client.get(
-                "https://api.github.com/user",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github+json",
-                    "X-GitHub-Api-Version": "2022-11-28",
-                },
-            )
-            user_resp.raise_for_status()
-            github_user = user_resp.json()
-            username = github_user.get("login")
-            if not username:
-                raise HTTPException(
-                    status_code=500, detail="Unable to fetch GitHub username"
-                )
-
-            # Step 5: Fetch public events using the username
-            events_resp = await client.get(
-                f"https://api.github.com/users/{username}/events/public",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github+json",
-                    "X-GitHub-Api-Version": "2022-11-28",
-                },
-                params={"per_page": min(limit, 100)},
+        # Step 4: Get GitHub username using /user
+        user_resp = await github.get("/user", access_token)
+        user_resp.raise_for_status()
+        github_user = github.json(user_resp)
+        username = github_user.get("login")
+        if not username:
+            raise HTTPException(
+                status_code=500, detail="Unable to fetch GitHub username"
             )
-            events_resp.raise_for_status()
-            events = events_resp.json()
+
+        # Step 5: Fetch public events using the username
+        events_resp = await github.get(
+            f"/users/{username}/events/public",
+            access_token,
+            params={"per_page": min(limit, 100)},
+        )
+        events_resp.raise_for_status()
+        events = github.json(events_resp)
 
     except httpx.HTTPStatusError as e:
         raise HTTPException(
             status_code=e.response.status_code,
             detail=f"GitHub API error: {e.response.text}",
         )
+    except GitHubRateLimited:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
@@ -153,204 +154,322 @@ async def fetch_latest_github_events(
     )
 
 
+def encode_events_cursor(occurred_at: datetime, event_id: uuid.UUID) -> str:
+    raw = f"{occurred_at.isoformat()}|{event_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_events_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        occurred_at, event_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return naive_utc(datetime.fromisoformat(occurred_at)), uuid.UUID(event_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def user_events_query(
+    columns: list,
+    user_id: uuid.UUID,
+    repo_id: Optional[int] = None,
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Select:
+    """
+    Selects `columns` of a user's events, narrowed by the optional filters.
+    `since` and `until` may be timezone-aware (e.g. "...Z" in a query string);
+    they are compared as naive UTC, like `occurred_at` itself.
+    """
+    stmt = select(*columns).where(GitHubEvents.user_id == user_id)
+    if repo_id is not None:
+        stmt = stmt.where(GitHubEvents.repo_id == repo_id)
+    if event_type:
+        stmt = stmt.where(GitHubEvents.event_type == event_type)
+    if since is not None:
+        stmt = stmt.where(GitHubEvents.occurred_at >= naive_utc(since))
+    if until is not None:
+        stmt = stmt.where(GitHubEvents.occurred_at < naive_utc(until))
+    return stmt
+
+
 @router.get("/all", response_model=EventsResponse)
-async def get_user_events(user_id: str, db: AsyncSession = Depends(get_db_session)):
+async def get_user_events(
+    user_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    repo_id: Optional[int] = None,
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_payload: bool = False,
+    db: AsyncSession = Depends(get_read_session),
+):
+    """
+    Returns a user's events newest first, one page at a time. Pass the
+    returned `next_cursor` back as `cursor` to continue; it is null on the
+    last page. `payload` is only loaded when `include_payload` is set.
+    """
     try:
         user_uuid = uuid.UUID(user_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid user_id format")
 
     # Find user
-    stmt = select(User).where(User.id == user_uuid)
+    stmt = select(User.id).where(User.id == user_uuid)
     result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
-
-    if not user:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Fetch all events for the user
-    stmt = (
-        select(GitHubEvents)
-        .where(GitHubEvents.user_id == user.id)
-        .order_by(GitHubEvents.occurred_at.desc())
-    )
+    # Seek on (occurred_at, id) so each page is an index range scan on
+    # (user_id, occurred_at DESC) however much history precedes it.
+    columns = [
+        GitHubEvents.id,
+        GitHubEvents.event_type,
+        GitHubEvents.repo_id,
+        GitHubEvents.occurred_at,
+        GitHubEvents.processed,
+    ]
+    if include_payload:
+        columns.append(GitHubEvents.payload)
+    stmt = user_events_query(columns, user_uuid, repo_id, event_type, since, until)
+    if cursor:
+        stmt = stmt.where(
+            tuple_(GitHubEvents.occurred_at, GitHubEvents.id)
+            < tuple_(*decode_events_cursor(cursor))
+        )
+    stmt = stmt.order_by(
+        GitHubEvents.occurred_at.desc(), GitHubEvents.id.desc()
+    ).limit(limit + 1)
     result = await db.execute(stmt)
-    events = result.scalars().all()
+    rows = result.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_events_cursor(rows[-1].occurred_at, rows[-1].id)
 
-    # Map to Pydantic model
     response_events = [
         GitHubEventResponse(
-            id=str(event.id),
-            event_type=event.event_type,
-            repo_id=event.repo_id,
-            payload=event.payload,
-            occurred_at=event.occurred_at,
-            processed=event.processed,
+            id=str(row.id),
+            event_type=row.event_type,
+            repo_id=row.repo_id,
+            payload=row.payload if include_payload else None,
+            occurred_at=row.occurred_at,
+            processed=row.processed,
         )
-        for event in events
+        for row in rows
     ]
 
     return EventsResponse(
-        message="Events retrieved successfully", events=response_events
+        message="Events retrieved successfully",
+        events=response_events,
+        next_cursor=next_cursor,
     )
 
 
-@router.get("/last", response_model=EventsResponse)
-async def get_user_latest_events(
-    user_id: str, limit: int = 10, db: AsyncSession = Depends(get_db_session)
+async def stream_events_ndjson(stmt: Select, gzip: bool) -> AsyncIterator[bytes]:
+    """
+    Yields the rows of `stmt` as NDJSON, one chunk per fetched batch.
+
+    Runs in its own read session, since the response outlives the request's
+    dependencies. Rows come from a server-side cursor, so memory use is
+    bounded by the batch size rather than the history size.
+    """
+    compressor = (
+        # wbits=31 writes a gzip container
+        zlib.compressobj(settings.EVENTS_EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)
+        if gzip
+        else None
+    )
+    session_factory = await read_sessionmaker()
+    async with session_factory() as session:
+        result = await session.stream(
+            stmt.execution_options(yield_per=settings.EVENTS_EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.mappings().partitions():
+            chunk = b"".join(codec.dumps(dict(row)) + b"\n" for row in rows)
+            if compressor is not None:
+                # Sync-flush so each batch reaches the client right away
+                chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield chunk
+    if compressor is not None:
+        yield compressor.flush()
+
+
+@router.get("/export")
+async def export_user_events(
+    user_id: str,
+    repo_id: Optional[int] = None,
+    event_type: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_read_session),
 ):
+    """
+    Streams a user's whole event history, oldest first, as NDJSON (one event
+    object per line). With `gzip=true` the body is gzip-encoded.
+    """
     try:
         user_uuid = uuid.UUID(user_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid user_id format")
 
-    # Find user
-    stmt = select(User).where(User.id == user_uuid)
+    stmt = select(User.id).where(User.id == user_uuid)
     result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
-
-    if not user:
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Get GitHub access token
-    stmt = select(UserOAuth).where(
-        UserOAuth.user_id == user.id, UserOAuth.provider == "github"
+    columns = [
+        GitHubEvents.id,
+        GitHubEvents.event_type,
+        GitHubEvents.repo_id,
+        GitHubEvents.event_id_gh,
+        GitHubEvents.occurred_at,
+        GitHubEvents.processed,
+        GitHubEvents.payload,
+    ]
+    stmt = user_events_query(
+        columns, user_uuid, repo_id, event_type, since, until
+    ).order_by(GitHubEvents.occurred_at, GitHubEvents.id)
+
+    headers = {"Content-Disposition": f'attachment; filename="events-{user_uuid}.ndjson"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_events_ndjson(stmt, gzip),
+        media_type="application/x-ndjson",
+        headers=headers,
     )
-    result = await db.execute(stmt)
-    user_oauth = result.scalar_one_or_none()
-
-    if not user_oauth:
-        raise HTTPException(status_code=404, detail="GitHub OAuth not found for user")
-
-    access_token = decrypt_token(user_oauth.access_token)
-
-    # Fetch recent events from GitHub API with retry logic for rate limits
-    async def fetch_with_retry(url, headers, params, retries=3, backoff=2):
-        for attempt in range(retries):
-            async with httpx.AsyncClient() as client:
-                try:
-                    response = await client.get(url, headers=headers, params=params)
-                    if response.status_code == 429:
-                        retry_after = int(response.headers.get("Retry-After", backoff))
-                        await asyncio.sleep(retry_after * (2**attempt))
-                        continue
-                    response.raise_for_status()
-                    return response.json()
-                except httpx.HTTPStatusError as e:
-                    if attempt == retries - 1:
-                        raise HTTPException(
-                            status_code=e.response.status_code, detail=str(e)
-                        )
-                    await asyncio.sleep(backoff * (2**attempt))
 
+
+@router.get("/last", response_model=EventsResponse)
+async def get_user_latest_events(
+    limit: int = 10,
+    credentials: GitHubCredentials = Depends(get_github_credentials),
+    db: AsyncSession = Depends(get_db_session),
+    github: GitHubClient = Depends(get_github_client),
+):
+    page_size = min(limit, 100)  # GitHub API limit
+    with EVENTS_LAST_LATENCY.labels(page_size=str(page_size)).time():
+        return await _sync_latest_events(credentials, page_size, db, github)
+
+
+async def _sync_latest_events(
+    credentials: GitHubCredentials,
+    page_size: int,
+    db: AsyncSession,
+    github: GitHubClient,
+) -> EventsResponse:
+    user_uuid = credentials.user_id
+    access_token = credentials.access_token
+
+    # Fetch recent events from GitHub API. The client paces requests per token
+    # and raises GitHubRateLimited (served as 429 + Retry-After) instead of
+    # sleeping here.
     try:
-        events = await fetch_with_retry(
-            url="https://api.github.com/user/events",
-            headers={"Authorization": f"Bearer {access_token}"},
-            params={"per_page": min(limit, 100)},  # GitHub API limit
+        response = await github.get(
+            "/user/events", access_token, params={"per_page": page_size}
         )
-        print(events)
+        response.raise_for_status()
+        events = github.json(response)
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 401:
             raise HTTPException(status_code=401, detail="Invalid GitHub token")
         raise HTTPException(
             status_code=400, detail=f"Failed to fetch GitHub events: {str(e)}"
         )
+    events = [event for event in events or [] if event.get("id")]
 
-    response_events = []
-    async with httpx.AsyncClient() as client:
-        for event in events:
-            repo_id = event.get("repo", {}).get("id")
-            event_id_gh = event.get("id")
-
-            # Check if event exists
-            stmt = select(GitHubEvents).where(GitHubEvents.event_id_gh == event_id_gh)
-            result = await db.execute(stmt)
-            existing_event = result.scalar_one_or_none()
-            if existing_event:
-                response_events.append(
-                    GitHubEventResponse(
-                        id=str(existing_event.id),
-                        event_type=existing_event.event_type,
-                        repo_id=existing_event.repo_id,
-                        payload=existing_event.payload,
-                        occurred_at=existing_event.occurred_at,
-                        processed=existing_event.processed,
-                    )
-                )
-                continue
-
-            # Fetch or create repository
-            stmt = select(Repository).where(Repository.id == repo_id)
-            result = await db.execute(stmt)
-            repo = result.scalar_one_or_none()
-            if not repo:
-                repo_data = event.get("repo", {})
-                try:
-                    repo_response = await client.get(
-                        f"https://api.github.com/repos/{repo_data.get('name')}",
-                        headers={"Authorization": f"Bearer {access_token}"},
-                    )
-                    repo_response.raise_for_status()
-                    repo_data = repo_response.json()
-
-                    repo = Repository(
-                        id=repo_data.get("id"),
-                        node_id=repo_data.get("node_id"),
-                        name=repo_data.get("name"),
-                        full_name=repo_data.get("full_name"),
-                        owner_login=repo_data.get("owner", {}).get("login"),
-                        owner_type=repo_data.get("owner", {}).get("type").lower(),
-                        private=repo_data.get("private", False),
-                        default_branch=repo_data.get("default_branch"),
-                        description=repo_data.get("description"),
-                        language=repo_data.get("language"),
-                        topics=repo_data.get("topics", []),
-                        homepage=repo_data.get("homepage"),
-                        license=repo_data.get("license"),
-                        stargazers_count=repo_data.get("stargazers_count", 0),
-                        forks_count=repo_data.get("forks_count", 0),
-                        created_at_gh=github_ts(repo_data.get("created_at")),
-                        updated_at_gh=github_ts(repo_data.get("updated_at")),
-                        pushed_at_gh=github_ts(repo_data.get("pushed_at")),
-                    )
-                    db.add(repo)
-                    await db.commit()
-                except httpx.HTTPStatusError:
-                    continue
-
-            # Store event
-            try:
-                occurred_at = datetime.strptime(
-                    event.get("created_at"), "%Y-%m-%dT%H:%M:%SZ"
-                )
-            except (ValueError, TypeError):
-                occurred_at = datetime.utcnow()
-
-            github_event = GitHubEvents(
-                id=uuid.uuid4(),
-                user_id=user.id,
-                repo_id=repo_id,
-                event_type=event.get("type"),
-                event_id_gh=event_id_gh,
-                payload=event,
-                occurred_at=occurred_at,
-                processed=False,
+    # One query for every event of this page we already stored
+    event_ids = [int(event["id"]) for event in events]
+    stmt = select(GitHubEvents).where(GitHubEvents.event_id_gh.in_(event_ids))
+    result = await db.execute(stmt)
+    stored = {event.event_id_gh: event for event in result.scalars()}
+
+    new_events = [event for event in events if int(event["id"]) not in stored]
+    if new_events:
+        # One query for the repositories they reference; unknown ones are
+        # fetched from GitHub and inserted together.
+        repo_names = {
+            event["repo"]["id"]: event["repo"].get("name")
+            for event in new_events
+            if event.get("repo", {}).get("id")
+        }
+        known_repo_ids = await existing_repository_ids(db, repo_names)
+        missing_repos = {
+            repo_id: name
+            for repo_id, name in repo_names.items()
+            if repo_id not in known_repo_ids
+        }
+        fetched_repos = await fetch_repositories(
+            github, access_token, missing_repos.values()
+        )
+        repo_rows = [repository_values(repo_data) for repo_data in fetched_repos]
+        await insert_repositories(db, repo_rows)
+        available_repo_ids = known_repo_ids | {row["id"] for row in repo_rows}
+
+        event_rows = [
+            {
+                "user_id": user_uuid,
+                "repo_id": event["repo"]["id"],
+                "event_type": event.get("type"),
+                "event_id_gh": int(event["id"]),
+                "payload": slim_payload(event.get("type", ""), event),
+                "payload_raw": compress_payload(codec.dumps(event)),
+                "occurred_at": github_ts(event.get("created_at")) or datetime.utcnow(),
+                "processed": False,
+            }
+            for event in new_events
+            if event.get("repo", {}).get("id") in available_repo_ids
+        ]
+        if event_rows:
+            stmt = (
+                insert(GitHubEvents)
+                .values(event_rows)
+                # A concurrent sync may have stored some of these since the
+                # lookup above
+                .on_conflict_do_nothing(index_elements=["event_id_gh", "occurred_at"])
+                .returning(GitHubEvents)
             )
-            db.add(github_event)
-            await db.commit()
-
-            response_events.append(
-                GitHubEventResponse(
-                    id=str(github_event.id),
-                    event_type=github_event.event_type,
-                    repo_id=github_event.repo_id,
-                    payload=github_event.payload,
-                    occurred_at=github_event.occurred_at,
-                    processed=github_event.processed,
-                )
+            result = await db.execute(stmt)
+            inserted = list(result.scalars())
+            stored.update({event.event_id_gh: event for event in inserted})
+            raced = [
+                row["event_id_gh"] for row in event_rows if row["event_id_gh"] not in stored
+            ]
+            if raced:
+                stmt = select(GitHubEvents).where(GitHubEvents.event_id_gh.in_(raced))
+                result = await db.execute(stmt)
+                stored.update({event.event_id_gh: event for event in result.scalars()})
+        await db.commit()
+        if event_rows:
+            commit_enricher.submit(
+                {
+                    "id": event.id,
+                    "occurred_at": event.occurred_at,
+                    "user_id": event.user_id,
+                    "event_type": event.event_type,
+                    "payload": event.payload,
+                }
+                for event in inserted
             )
 
+    # Respond in GitHub's feed order
+    response_events = [
+        GitHubEventResponse(
+            id=str(stored_event.id),
+            event_type=stored_event.event_type,
+            repo_id=stored_event.repo_id,
+            payload=stored_event.payload,
+            occurred_at=stored_event.occurred_at,
+            processed=stored_event.processed,
+        )
+        for stored_event in (stored.get(int(event["id"])) for event in events)
+        if stored_event is not None
+    ]
+
     return EventsResponse(
         message="Latest events retrieved successfully", events=response_events
     )
@@ -358,109 +477,58 @@ async def get_user_latest_events(
 
 @router.get("/repositories", response_model=RepositoriesResponse)
 async def list_user_repositories(
-    user_id: str, db: AsyncSession = Depends(get_db_session)
+    credentials: GitHubCredentials = Depends(get_github_credentials),
+    db: AsyncSession = Depends(get_db_session),
+    github: GitHubClient = Depends(get_github_client),
 ):
-    try:
-        user_uuid = uuid.UUID(user_id)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid user_id format")
-
-    # Find user
-    stmt = select(User).where(User.id == user_uuid)
-    result = await db.execute(stmt)
-    user = result.scalar_one_or_none()
-
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    # Get GitHub access token
-    stmt = select(UserOAuth).where(
-        UserOAuth.user_id == user.id, UserOAuth.provider == "github"
-    )
-    result = await db.execute(stmt)
-    user_oauth = result.scalar_one_or_none()
-
-    if not user_oauth:
-        raise HTTPException(status_code=404, detail="GitHub OAuth not found for user")
+    access_token = credentials.access_token
 
-    access_token = decrypt_token(user_oauth.access_token)
-
-    # Fetch repositories from GitHub API
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                "https://api.github.com/user/repos",
-                headers={"Authorization": f"Bearer {access_token}"},
-                params={"per_page": 100},
-            )
-            if response.status_code == 401:
-                raise HTTPException(status_code=401, detail="Invalid GitHub token")
-            if response.status_code == 429:
-                raise HTTPException(
-                    status_code=429, detail="GitHub API rate limit exceeded"
-                )
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=400, detail="Failed to fetch repositories"
-                )
-            repos = response.json()
-        except httpx.HTTPStatusError as e:
+    # Fetch every page of repositories from GitHub API
+    try:
+        repos = await fetch_all_pages(github, access_token, "/user/repos")
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 401:
+            raise HTTPException(status_code=401, detail="Invalid GitHub token")
+        if e.response.status_code == 429:
             raise HTTPException(
-                status_code=400, detail=f"Failed to fetch repositories: {str(e)}"
+                status_code=429, detail="GitHub API rate limit exceeded"
             )
+        raise HTTPException(
+            status_code=400, detail=f"Failed to fetch repositories: {str(e)}"
+        )
 
-    response_repos = []
+    # One batched upsert that also refreshes stars, forks, pushed_at, ...
+    rows = {}
     for repo_data in repos:
-        repo_id = repo_data.get("id")
-        stmt = select(Repository).where(Repository.id == repo_id)
-        result = await db.execute(stmt)
-        repo = result.scalar_one_or_none()
-        if not repo:
-            repo = Repository(
-                id=repo_data.get("id"),
-                node_id=repo_data.get("node_id"),
-                name=repo_data.get("name"),
-                full_name=repo_data.get("full_name"),
-                owner_login=repo_data.get("owner", {}).get("login"),
-                owner_type=repo_data.get("owner", {}).get("type").lower(),
-                private=repo_data.get("private", False),
-                default_branch=repo_data.get("default_branch"),
-                description=repo_data.get("description"),
-                language=repo_data.get("language"),
-                topics=repo_data.get("topics", []),
-                homepage=repo_data.get("homepage"),
-                license=repo_data.get("license"),
-                stargazers_count=repo_data.get("stargazers_count", 0),
-                forks_count=repo_data.get("forks_count", 0),
-                created_at_gh=github_ts(repo_data.get("created_at")),
-                updated_at_gh=github_ts(repo_data.get("updated_at")),
-                pushed_at_gh=github_ts(repo_data.get("pushed_at")),
-            )
-            db.add(repo)
-            await db.commit()
-
-        response_repos.append(
-            RepositoryResponse(
-                id=repo.id,
-                node_id=repo.node_id,
-                name=repo.name,
-                full_name=repo.full_name,
-                owner_login=repo.owner_login,
-                owner_type=repo.owner_type,
-                private=repo.private,
-                default_branch=repo.default_branch,
-                description=repo.description,
-                language=repo.language,
-                topics=repo.topics,
-                homepage=repo.homepage,
-                license=repo.license,
-                stargazers_count=repo.stargazers_count,
-                forks_count=repo.forks_count,
-                created_at_gh=repo.created_at_gh,
-                updated_at_gh=repo.updated_at_gh,
-                pushed_at_gh=repo.pushed_at_gh,
-            )
+        if repo_data.get("id"):
+            rows[repo_data["id"]] = repository_values(repo_data)
+    stored = {repo.id: repo for repo in await upsert_repositories(db, list(rows.values()))}
+    await db.commit()
+
+    response_repos = [
+        RepositoryResponse(
+            id=repo.id,
+            node_id=repo.node_id,
+            name=repo.name,
+            full_name=repo.full_name,
+            owner_login=repo.owner_login,
+            owner_type=repo.owner_type,
+            private=repo.private,
+            default_branch=repo.default_branch,
+            description=repo.description,
+            language=repo.language,
+            topics=repo.topics,
+            homepage=repo.homepage,
+            license=repo.license,
+            stargazers_count=repo.stargazers_count,
+            forks_count=repo.forks_count,
+            created_at_gh=repo.created_at_gh,
+            updated_at_gh=repo.updated_at_gh,
+            pushed_at_gh=repo.pushed_at_gh,
         )
+        for repo in (stored.get(repo_id) for repo_id in rows)
+        if repo is not None
+    ]
 
     return RepositoriesResponse(
         message="Repositories retrieved successfully", repositories=response_repos
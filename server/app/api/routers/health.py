@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.services.health import get_health_status
 
 router = APIRouter()
@@ -7,3 +8,8 @@ router = APIRouter()
 @router.get("/health", response_model=dict)
 async def health_check():
     return get_health_status()
+
+
+@router.get("/metrics")
+async def metrics():
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -6,11 +6,13 @@ import uuid
 import secrets
 
 from app.api.core.config import settings
-from app.api.core.database import AsyncSession, get_db_session
-from app.api.core.security import decrypt_token
+from app.api.core.database import AsyncSession, get_db_session, get_read_session
+from app.api.core.github import GitHubClient
+from app.api.core.ratelimit import GitHubRateLimited
+from app.api.core.security import WebhookSignatureVerifier
+from app.api.dependencies.github import get_github_client
 from app.api.models import (
     User,
-    UserOAuth,
     Repository,
 )
 from app.api.models import Webhook
@@ -18,13 +20,23 @@ from pydantic import BaseModel, HttpUrl
 from typing import List, Optional
 from datetime import datetime
 from fastapi import APIRouter, Request, HTTPException, Depends, status, Header
+from fastapi.responses import JSONResponse
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from app.api.core.database import AsyncSession, get_db_session
 from app.api.models import GitHubEvents, Webhook, Repository
-from app.api.utils import github_ts
-import hmac
-import hashlib
-import json
+from app.api.utils import codec, github_ts
+from app.api.utils.payloads import compress_payload, slim_payload
+from app.services.commit_enrichment import commit_enricher
+from app.services.dedup import delivery_dedup, parse_delivery_id
+from app.services.event_writer import event_writer, EventBufferFull
+from app.services.github_tokens import get_github_token
+from app.services.repositories import repository_values, upsert_repositories
+from app.services.webhook_secrets import (
+    WebhookSecret,
+    get_webhook_secret,
+    invalidate_webhook_secret,
+)
 from typing import Optional
 
 router = APIRouter()
@@ -34,6 +46,8 @@ class WebhookCreate(BaseModel):
     repo_full_name: str
     events: List[str] = ["push", "pull_request", "issues", "commit_comment"]
     active: bool = True
+    # Base URL of the token receiver, e.g. https://host/api/v1/webhook/github/webhook-events;
+    # the webhook's routing token is appended to it when registering with GitHub.
     config_url: HttpUrl
 
 
@@ -74,46 +88,38 @@ async def get_github_access_token(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid user_id format"
         )
 
-    stmt = select(UserOAuth).where(
-        UserOAuth.user_id == user_uuid, UserOAuth.provider == "github"
-    )
-    result = await db.execute(stmt)
-    user_oauth = result.scalar_one_or_none()
-
-    if not user_oauth:
+    access_token = await get_github_token(db, user_uuid)
+    if access_token is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="GitHub OAuth not found for user",
         )
-
-    return decrypt_token(user_oauth.access_token)
+    return access_token
 
 
-async def get_repository_details(repo_full_name: str, access_token: str) -> dict:
+async def get_repository_details(
+    repo_full_name: str, access_token: str, github: GitHubClient
+) -> dict:
     """Helper to fetch repository details from GitHub."""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"https://api.github.com/repos/{repo_full_name}",
-                headers={"Authorization": f"Bearer {access_token}"},
+    try:
+        response = await github.get(f"/repos/{repo_full_name}", access_token)
+        response.raise_for_status()
+        return github.json(response)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Repository '{repo_full_name}' not found on GitHub or not accessible.",
             )
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail=f"Repository '{repo_full_name}' not found on GitHub or not accessible.",
-                )
-            elif e.response.status_code == 401:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid GitHub token.",
-                )
+        elif e.response.status_code == 401:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to fetch repository details from GitHub: {e.response.text}",
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid GitHub token.",
             )
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch repository details from GitHub: {e.response.text}",
+        )
 
 
 @router.post(
@@ -126,6 +132,7 @@ async def create_repository_webhook(
     webhook_data: WebhookCreate,
     db: AsyncSession = Depends(get_db_session),
     access_token: str = Depends(get_github_access_token),
+    github: GitHubClient = Depends(get_github_client),
 ):
     """
     Attaches a webhook to a specified GitHub repository for the given user.
@@ -134,45 +141,14 @@ async def create_repository_webhook(
 
     # 1. Fetch repository details from GitHub and store/update in DB
     repo_details = await get_repository_details(
-        webhook_data.repo_full_name, access_token
+        webhook_data.repo_full_name, access_token, github
     )
     repo_id = repo_details["id"]
     repo_full_name = repo_details["full_name"]
 
-    stmt = select(Repository).where(Repository.id == repo_id)
-    result = await db.execute(stmt)
-    repository = result.scalar_one_or_none()
-
-    if not repository:
-        # Create a new repository entry if it doesn't exist
-        repository = Repository(
-            id=repo_details.get("id"),
-            node_id=repo_details.get("node_id"),
-            name=repo_details.get("name"),
-            full_name=repo_details.get("full_name"),
-            owner_login=repo_details.get("owner", {}).get("login"),
-            owner_type=repo_details.get("owner", {}).get("type").lower(),
-            private=repo_details.get("private", False),
-            default_branch=repo_details.get("default_branch"),
-            description=repo_details.get("description"),
-            language=repo_details.get("language"),
-            topics=repo_details.get("topics", []),
-            homepage=repo_details.get("homepage"),
-            license=repo_details.get("license"),
-            stargazers_count=repo_details.get("stargazers_count", 0),
-            forks_count=repo_details.get("forks_count", 0),
-            created_at_gh=repo_details.get(
-                "created_at"
-            ),  # Assuming github_ts conversion happens elsewhere or handled by ORM
-            updated_at_gh=repo_details.get("updated_at"),
-            pushed_at_gh=repo_details.get("pushed_at"),
-        )
-        db.add(repository)
-        await db.commit()
-        await db.refresh(repository)
-    else:
-        # Optionally update existing repository details if needed
-        pass  # For this example, we'll assume details are up-to-date or not critical to update on webhook creation
+    # Insert the repository, or refresh the stored row with what GitHub just sent
+    await upsert_repositories(db, [repository_values(repo_details)])
+    await db.commit()
 
     # 2. Check if webhook already exists for this repo and user
     stmt = select(Webhook).where(
@@ -188,46 +164,45 @@ async def create_repository_webhook(
 
     # 3. Create webhook on GitHub
     webhook_secret = secrets.token_hex(20)  # Generate a secure secret
+    # Opaque token appended to the delivery URL so the receiver can find this
+    # exact webhook (and its secret) without looking inside the payload.
+    route_token = secrets.token_urlsafe(24)
     github_webhook_payload = {
         "name": "web",  # "web" for a URL-based webhook
         "active": webhook_data.active,
         "events": webhook_data.events,
         "config": {
-            "url": str(
-                webhook_data.config_url
-            ),  # The public URL where GitHub sends events
+            # The public URL where GitHub sends events
+            "url": f"{str(webhook_data.config_url).rstrip('/')}/{route_token}",
             "content_type": "json",
             "secret": webhook_secret,
         },
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            github_response = await client.post(
-                f"https://api.github.com/repos/{repo_full_name}/hooks",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json",
-                    "X-GitHub-Api-Version": "2022-11-28",
-                },
-                json=github_webhook_payload,
-            )
-            github_response.raise_for_status()
-            github_webhook_data = github_response.json()
-            github_webhook_id = github_webhook_data["id"]
-            github_webhook_url = github_webhook_data[
-                "url"
-            ]  # The URL to manage the webhook on GitHub
-        except httpx.HTTPStatusError as e:
-            detail = f"Failed to create webhook on GitHub: {e.response.text}"
-            if e.response.status_code == 404:
-                detail = f"Repository '{repo_full_name}' not found on GitHub or user lacks permissions to create webhooks."
-            raise HTTPException(status_code=e.response.status_code, detail=detail)
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Unexpected error when creating webhook on GitHub: {str(e)}",
-            )
+    try:
+        github_response = await github.post(
+            f"/repos/{repo_full_name}/hooks",
+            access_token,
+            json=github_webhook_payload,
+        )
+        github_response.raise_for_status()
+        github_webhook_data = codec.loads(github_response.content)
+        github_webhook_id = github_webhook_data["id"]
+        github_webhook_url = github_webhook_data[
+            "url"
+        ]  # The URL to manage the webhook on GitHub
+    except httpx.HTTPStatusError as e:
+        detail = f"Failed to create webhook on GitHub: {e.response.text}"
+        if e.response.status_code == 404:
+            detail = f"Repository '{repo_full_name}' not found on GitHub or user lacks permissions to create webhooks."
+        raise HTTPException(status_code=e.response.status_code, detail=detail)
+    except GitHubRateLimited:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected error when creating webhook on GitHub: {str(e)}",
+        )
 
     # 4. Store webhook information in your database
     new_webhook = Webhook(
@@ -236,6 +211,7 @@ async def create_repository_webhook(
         github_webhook_id=github_webhook_id,
         url=github_webhook_url,  # Store the GitHub-provided URL for management
         secret=webhook_secret,
+        route_token=route_token,
         events=webhook_data.events,
         active=webhook_data.active,
     )
@@ -243,6 +219,7 @@ async def create_repository_webhook(
     try:
         await db.commit()
         await db.refresh(new_webhook)
+        await invalidate_webhook_secret(new_webhook)
     except IntegrityError:
         await db.rollback()
         # If there's a race condition and it somehow gets added between check and insert
@@ -252,11 +229,9 @@ async def create_repository_webhook(
         )
     except Exception as e:
         # Consider deleting the webhook from GitHub if DB commit fails
-        async with httpx.AsyncClient() as client:
-            await client.delete(
-                f"https://api.github.com/repos/{repo_full_name}/hooks/{github_webhook_id}",
-                headers={"Authorization": f"Bearer {access_token}"},
-            )
+        await github.delete(
+            f"/repos/{repo_full_name}/hooks/{github_webhook_id}", access_token
+        )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to store webhook in database: {str(e)}",
@@ -266,7 +241,9 @@ async def create_repository_webhook(
 
 
 @router.get("/{user_id}/webhooks", response_model=WebhooksListResponse)
-async def list_user_webhooks(user_id: str, db: AsyncSession = Depends(get_db_session)):
+async def list_user_webhooks(
+    user_id: str, db: AsyncSession = Depends(get_read_session)
+):
     """
     Lists all webhooks associated with the user for their selected repositories.
     """
@@ -297,6 +274,7 @@ async def delete_repository_webhook(
     webhook_id: uuid.UUID,
     db: AsyncSession = Depends(get_db_session),
     access_token: str = Depends(get_github_access_token),
+    github: GitHubClient = Depends(get_github_client),
 ):
     """
     Deletes a specific webhook from a user's repository.
@@ -330,42 +308,39 @@ async def delete_repository_webhook(
     github_webhook_id = webhook_to_delete.github_webhook_id
 
     # 3. Delete webhook from GitHub
-    async with httpx.AsyncClient() as client:
-        try:
-            github_response = await client.delete(
-                f"https://api.github.com/repos/{repo_full_name}/hooks/{github_webhook_id}",
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/vnd.github.v3+json",
-                    "X-GitHub-Api-Version": "2022-11-28",
-                },
+    try:
+        github_response = await github.delete(
+            f"/repos/{repo_full_name}/hooks/{github_webhook_id}", access_token
+        )
+        github_response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code == 404:
+            # Webhook might already be deleted on GitHub, proceed to delete from DB
+            print(
+                f"Webhook {github_webhook_id} not found on GitHub, deleting from DB anyway."
             )
-            github_response.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 404:
-                # Webhook might already be deleted on GitHub, proceed to delete from DB
-                print(
-                    f"Webhook {github_webhook_id} not found on GitHub, deleting from DB anyway."
-                )
-            elif e.response.status_code == 401:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid GitHub token for deleting webhook.",
-                )
-            else:
-                raise HTTPException(
-                    status_code=e.response.status_code,
-                    detail=f"Failed to delete webhook on GitHub: {e.response.text}",
-                )
-        except Exception as e:
+        elif e.response.status_code == 401:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Unexpected error when deleting webhook from GitHub: {str(e)}",
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid GitHub token for deleting webhook.",
             )
+        else:
+            raise HTTPException(
+                status_code=e.response.status_code,
+                detail=f"Failed to delete webhook on GitHub: {e.response.text}",
+            )
+    except GitHubRateLimited:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unexpected error when deleting webhook from GitHub: {str(e)}",
+        )
 
     # 4. Delete webhook from your database
     await db.delete(webhook_to_delete)
     await db.commit()
+    await invalidate_webhook_secret(webhook_to_delete)
 
     return WebhookDeleteResponse(
         message="Webhook deleted successfully", webhook_id=webhook_id
@@ -376,20 +351,210 @@ def verify_github_signature(payload_body: bytes, secret: str, signature: str) ->
     """
     Verifies the SHA256 signature of the incoming GitHub webhook payload.
     """
+    verifier = WebhookSignatureVerifier(secret)
+    verifier.update(payload_body)
+    return verifier.verify(signature)
+
+
+def build_github_event_row(
+    payload_json: dict,
+    payload_body: bytes,
+    event_type: str,
+    delivery_id: uuid.UUID,
+    user_id: uuid.UUID,
+    repo_id: int,
+) -> dict:
+    """
+    Maps a verified webhook delivery onto the columns of `github_events`.
+    """
+    # Extract occurred_at from the payload, typically 'created_at' for most events
+    # Or 'pushed_at' for push events, etc.
+    # This might need more robust parsing based on event type.
+    occurred_at_str = (
+        payload_json.get("hook", {}).get("created_at")
+        or payload_json.get("event", {}).get("created_at")
+        or payload_json.get("created_at")
+    )
+    if not occurred_at_str and "push" in event_type:
+        # For push events, the timestamp is often derived from the last commit
+        # or the overall push event timestamp if available.
+        # For simplicity, we'll use current UTC time if not explicitly in payload.
+        occurred_at = datetime.utcnow()
+    else:
+        occurred_at = github_ts(occurred_at_str) if occurred_at_str else datetime.utcnow()
+
+    return {
+        "user_id": user_id,
+        "repo_id": repo_id,
+        "event_type": event_type,
+        # The full X-GitHub-Delivery GUID uniquely identifies the delivery
+        "delivery_id": delivery_id,
+        "payload": slim_payload(event_type, payload_json),
+        "payload_raw": compress_payload(payload_body),
+        "occurred_at": occurred_at,
+        "processed": False,  # Mark as false, a background worker can process it later
+    }
+
+
+def require_signature_header(signature: Optional[str], delivery_id: str) -> None:
     if not signature:
-        return False
+        # GitHub always sends a signature for webhooks with a secret.
+        # If no signature is present, it's either misconfigured or not from GitHub.
+        print(f"Warning: No X-Hub-Signature-256 header. Delivery ID: {delivery_id}")
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Signature header missing."
+        )
+
+
+def reject_invalid_signature(delivery_id: str) -> None:
+    print(f"Warning: Invalid signature for webhook. Delivery ID: {delivery_id}")
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid signature."
+    )
+
+
+def check_delivery_signature(
+    payload_body: bytes, secret: str, signature: Optional[str], delivery_id: str
+) -> None:
+    """
+    Rejects the delivery unless its X-Hub-Signature-256 matches the webhook secret.
+    """
+    require_signature_header(signature, delivery_id)
+    if not verify_github_signature(payload_body, secret, signature):
+        reject_invalid_signature(delivery_id)
+
+
+async def read_delivery_body(
+    request: Request,
+    delivery_id: str,
+    secret: Optional[str] = None,
+    signature: Optional[str] = None,
+) -> bytes:
+    """
+    Reads the request body, refusing anything over WEBHOOK_MAX_BODY_BYTES.
+    When the webhook secret is already known, the HMAC is fed chunk by chunk
+    as the body streams in and checked before the payload is ever decoded.
+    """
+    max_bytes = settings.WEBHOOK_MAX_BODY_BYTES
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Webhook payload too large.",
+        )
+
+    verifier = WebhookSignatureVerifier(secret) if secret is not None else None
+    body = bytearray()
+    async for chunk in request.stream():
+        if len(body) + len(chunk) > max_bytes:
+            print(f"Warning: Oversized webhook payload. Delivery ID: {delivery_id}")
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Webhook payload too large.",
+            )
+        if verifier is not None:
+            verifier.update(chunk)
+        body.extend(chunk)
+
+    if verifier is not None and not verifier.verify(signature):
+        reject_invalid_signature(delivery_id)
+    return bytes(body)
+
+
+def parse_delivery_payload(payload_body: bytes) -> dict:
+    try:
+        return codec.loads(payload_body)
+    except codec.DecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON payload"
+        )
+
+
+async def store_webhook_event(
+    db: AsyncSession,
+    payload_json: dict,
+    payload_body: bytes,
+    event_type: str,
+    delivery_id: str,
+    stored_webhook: WebhookSecret,
+    repo_id: int,
+):
+    """
+    Persists a verified delivery, either directly or through the batch writer.
+    Redeliveries are answered from the dedup cache without touching the table.
+    """
+    delivery_uuid = parse_delivery_id(delivery_id)
+    if delivery_uuid is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid X-GitHub-Delivery header.",
+        )
+
+    if await delivery_dedup.seen(delivery_uuid):
+        print(f"Info: Duplicate delivery {delivery_id}. Skipping processing.")
+        return {"message": "Event already processed"}
+
+    try:
+        github_event_row = build_github_event_row(
+            payload_json,
+            payload_body,
+            event_type=event_type,
+            delivery_id=delivery_uuid,
+            user_id=stored_webhook.user_id,
+            repo_id=repo_id,
+        )
 
-    # Extract the hash from the signature header (e.g., "sha256=abcdef12345...")
-    sha_name, signature_hash = signature.split("=", 1)
-    if sha_name != "sha256":
-        return False
+        if settings.WEBHOOK_FAST_ACK:
+            # Acknowledge immediately; the batch writer persists the row shortly.
+            try:
+                event_writer.submit(github_event_row)
+            except EventBufferFull:
+                await delivery_dedup.forget(delivery_uuid)
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Webhook ingest buffer is full, retry later.",
+                    headers={"Retry-After": "1"},
+                )
+            return JSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={"message": "Webhook event accepted for processing"},
+            )
 
-    # Create an HMAC object using the secret and the payload body
-    # The secret must be bytes, and the payload_body must be bytes
-    mac = hmac.new(secret.encode("utf-8"), msg=payload_body, digestmod=hashlib.sha256)
+        # The ledger insert catches redeliveries the Redis TTL has forgotten
+        if not await delivery_dedup.claim(db, delivery_uuid):
+            await db.rollback()
+            print(f"Info: Duplicate delivery {delivery_id}. Skipping processing.")
+            return {"message": "Event already processed"}
 
-    # Compare the computed hash with the provided signature hash
-    return hmac.compare_digest(mac.hexdigest(), signature_hash)
+        # Store the event in your database
+        github_event = GitHubEvents(**github_event_row)
+        db.add(github_event)
+        await db.commit()
+        commit_enricher.submit([{**github_event_row, "id": github_event.id}])
+
+        print(
+            f"Successfully received and stored GitHub event: {event_type} for repo {repo_id}"
+        )
+        return {"message": "Webhook event received and stored successfully"}
+
+    except HTTPException:
+        raise
+    except IntegrityError:
+        await db.rollback()
+        await delivery_dedup.forget(delivery_uuid)
+        print(f"IntegrityError storing delivery {delivery_id}.")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Event already exists or database conflict.",
+        )
+    except Exception as e:
+        await db.rollback()  # Ensure rollback on any other error
+        await delivery_dedup.forget(delivery_uuid)
+        print(f"Error processing GitHub webhook: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error processing webhook: {str(e)}",
+        )
 
 
 @router.post("/github/webhook-events")
@@ -400,18 +565,44 @@ async def github_webhook_receiver(
     x_github_event: str = Header(..., alias="X-GitHub-Event"),
     x_github_delivery: str = Header(..., alias="X-GitHub-Delivery"),
     x_hub_signature_256: Optional[str] = Header(None, alias="X-Hub-Signature-256"),
+    x_github_hook_id: Optional[int] = Header(None, alias="X-GitHub-Hook-ID"),
 ):
     """
     Endpoint to receive and process GitHub webhook events.
+    Kept for webhooks registered before per-webhook routing tokens existed.
     """
-    payload_body = await request.body()
-    try:
-        payload_json = json.loads(payload_body)
-    except json.JSONDecodeError:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid JSON payload"
+    require_signature_header(x_hub_signature_256, x_github_delivery)
+
+    if x_github_hook_id is not None:
+        # GitHub identifies the hook that sent the delivery, which pins down the
+        # exact webhook (and its secret) before the body is read.
+        stored_webhook = await get_webhook_secret(db, github_webhook_id=x_github_hook_id)
+        if not stored_webhook:
+            print(
+                f"Warning: No matching webhook found in DB for hook {x_github_hook_id}. Delivery ID: {x_github_delivery}"
+            )
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Webhook configuration not found.",
+            )
+        payload_body = await read_delivery_body(
+            request, x_github_delivery, stored_webhook.secret, x_hub_signature_256
+        )
+        payload_json = parse_delivery_payload(payload_body)
+        return await store_webhook_event(
+            db,
+            payload_json,
+            payload_body,
+            event_type=x_github_event,
+            delivery_id=x_github_delivery,
+            stored_webhook=stored_webhook,
+            repo_id=payload_json.get("repository", {}).get("id")
+            or stored_webhook.repo_id,
         )
 
+    payload_body = await read_delivery_body(request, x_github_delivery)
+    payload_json = parse_delivery_payload(payload_body)
+
     # Extract repository ID from the payload to find the corresponding webhook secret
     # GitHub webhook payloads typically have a 'repository' object with an 'id'
     repo_id = payload_json.get("repository", {}).get("id")
@@ -425,25 +616,10 @@ async def github_webhook_receiver(
             detail="Repository ID not found in payload.",
         )
 
-    # Fetch the webhook secret from your database using repo_id and potentially user_id
-    # Note: A single repo might have multiple webhooks by different users.
-    # For simplicity, we'll assume one webhook per repo for now, or you'll need
-    # a more sophisticated way to map incoming webhooks to your stored secrets.
-    # If a user can only attach one webhook per repo, then `repo_id` is sufficient.
-    # If multiple users can attach webhooks to the *same* repo, your `Webhook` table
-    # might need a `user_id` in the query to uniquely identify the secret.
-    # For now, we'll fetch *any* webhook associated with this repo_id and use its secret.
-    # A more robust solution might involve storing the GitHub webhook ID in the payload
-    # or a unique identifier in the webhook URL itself.
-
-    stmt = select(Webhook).where(Webhook.repo_id == repo_id)
-    # If you have multiple webhooks per repo (e.g., different users setting them up),
-    # you might need to refine this query to find the *exact* webhook.
-    # For instance, if you embed a user_id or a custom identifier in your config_url,
-    # you could extract it from request.url and use it here.
-    # For now, we'll just pick the first one found.
-    result = await db.execute(stmt)
-    stored_webhook = result.scalar_one_or_none()
+    # Without a hook ID, fall back to *any* webhook registered for this
+    # repo_id. The lookup is served from a process-local cache, so the
+    # database is only hit on a miss.
+    stored_webhook = await get_webhook_secret(db, repo_id=repo_id)
 
     if not stored_webhook:
         print(
@@ -454,98 +630,56 @@ async def github_webhook_receiver(
             detail="Webhook configuration not found for this repository.",
         )
 
-    # Verify the signature
-    if x_hub_signature_256:
-        if not verify_github_signature(
-            payload_body, stored_webhook.secret, x_hub_signature_256
-        ):
-            print(
-                f"Warning: Invalid signature for webhook. Delivery ID: {x_github_delivery}"
-            )
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid signature."
-            )
-    else:
-        # GitHub always sends a signature for webhooks with a secret.
-        # If no signature is present, it's either misconfigured or not from GitHub.
-        print(
-            f"Warning: No X-Hub-Signature-256 header. Delivery ID: {x_github_delivery}"
-        )
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED, detail="Signature header missing."
-        )
-
-    # Process the event
-    try:
-        # Extract user_id from the stored webhook for the GitHubEvents table
-        user_id_from_webhook = stored_webhook.user_id
-
-        # Extract occurred_at from the payload, typically 'created_at' for most events
-        # Or 'pushed_at' for push events, etc.
-        # This might need more robust parsing based on event type.
-        occurred_at_str = (
-            payload_json.get("hook", {}).get("created_at")
-            or payload_json.get("event", {}).get("created_at")
-            or payload_json.get("created_at")
-        )
-        if not occurred_at_str and "push" in x_github_event:
-            # For push events, the timestamp is often derived from the last commit
-            # or the overall push event timestamp if available.
-            # For simplicity, we'll use current UTC time if not explicitly in payload.
-            occurred_at = datetime.utcnow()
-        else:
-            occurred_at = (
-                github_ts(occurred_at_str) if occurred_at_str else datetime.utcnow()
-            )
-
-        # GitHub event ID (distinct from your internal UUID)
-        event_id_gh = int(
-            x_github_delivery.split("-")[0]
-        )  # GitHub delivery ID can serve as a unique event ID
+    check_delivery_signature(
+        payload_body, stored_webhook.secret, x_hub_signature_256, x_github_delivery
+    )
 
-        # Check if an event with this GitHub event ID already exists to prevent duplicates
-        existing_event_stmt = select(GitHubEvents).where(
-            GitHubEvents.event_id_gh == event_id_gh
-        )
-        existing_event_result = await db.execute(existing_event_stmt)
-        if existing_event_result.scalar_one_or_none():
-            print(
-                f"Info: Duplicate event received with GitHub ID {event_id_gh}. Skipping processing."
-            )
-            return {"message": "Event already processed"}
+    return await store_webhook_event(
+        db,
+        payload_json,
+        payload_body,
+        event_type=x_github_event,
+        delivery_id=x_github_delivery,
+        stored_webhook=stored_webhook,
+        repo_id=repo_id,
+    )
 
-        # Store the event in your database
-        github_event = GitHubEvents(
-            user_id=user_id_from_webhook,
-            repo_id=repo_id,
-            event_type=x_github_event,
-            event_id_gh=event_id_gh,
-            payload=payload_json,
-            occurred_at=occurred_at,
-            processed=False,  # Mark as false, a background worker can process it later
-        )
-        db.add(github_event)
-        await db.commit()
-        await db.refresh(github_event)
 
-        print(
-            f"Successfully received and stored GitHub event: {x_github_event} for repo {repo_id}"
-        )
-        return {"message": "Webhook event received and stored successfully"}
+@router.post("/github/webhook-events/{route_token}")
+async def github_webhook_token_receiver(
+    route_token: str,
+    request: Request,
+    db: AsyncSession = Depends(get_db_session),
+    x_github_event: str = Header(..., alias="X-GitHub-Event"),
+    x_github_delivery: str = Header(..., alias="X-GitHub-Delivery"),
+    x_hub_signature_256: Optional[str] = Header(None, alias="X-Hub-Signature-256"),
+):
+    """
+    Receives deliveries for webhooks registered with a routing token in their URL.
+    The token identifies the exact webhook, so the secret is resolved and the
+    signature checked while the body streams in, before it is ever decoded.
+    """
+    require_signature_header(x_hub_signature_256, x_github_delivery)
 
-    except IntegrityError:
-        await db.rollback()
-        # This might happen if event_id_gh is not truly unique across all webhooks,
-        # or if there's a race condition for a very rapid duplicate delivery.
-        print(f"IntegrityError storing event {event_id_gh}. Likely duplicate.")
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Event already exists or database conflict.",
-        )
-    except Exception as e:
-        await db.rollback()  # Ensure rollback on any other error
-        print(f"Error processing GitHub webhook: {e}")
+    stored_webhook = await get_webhook_secret(db, route_token=route_token)
+    if not stored_webhook:
+        print(f"Warning: Unknown webhook routing token. Delivery ID: {x_github_delivery}")
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error processing webhook: {str(e)}",
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Webhook configuration not found.",
         )
+
+    payload_body = await read_delivery_body(
+        request, x_github_delivery, stored_webhook.secret, x_hub_signature_256
+    )
+    payload_json = parse_delivery_payload(payload_body)
+
+    return await store_webhook_event(
+        db,
+        payload_json,
+        payload_body,
+        event_type=x_github_event,
+        delivery_id=x_github_delivery,
+        stored_webhook=stored_webhook,
+        repo_id=stored_webhook.repo_id,
+    )
@@ -1,2 +1,2 @@
-from .dt import github_ts
+from .dt import github_ts, naive_utc
 from .parser import model_to_dict
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+JSON encoding/decoding backed by the fastest library available.
+
+`JSON_CODEC` selects the backend ("orjson", "msgspec" or "json"); the default,
+"auto", picks the first one that is installed in that order.
+"""
+
+import json
+from typing import Any, Callable, Tuple, Type
+
+from app.api.core.config import settings
+
+
+def _orjson_codec():
+    import orjson
+
+    return orjson.loads, orjson.dumps, (orjson.JSONDecodeError,)
+
+
+def _msgspec_codec():
+    import msgspec
+
+    encoder = msgspec.json.Encoder()
+    return msgspec.json.decode, encoder.encode, (msgspec.DecodeError,)
+
+
+def _stdlib_codec():
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), default=str).encode()
+
+    return json.loads, dumps, (json.JSONDecodeError,)
+
+
+_BACKENDS = {
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+    "json": _stdlib_codec,
+}
+
+
+def _select_backend(name: str) -> Tuple[str, Callable, Callable, Tuple[Type[Exception], ...]]:
+    candidates = list(_BACKENDS) if name == "auto" else [name]
+    for candidate in candidates:
+        try:
+            return (candidate, *_BACKENDS[candidate]())
+        except ImportError:
+            continue
+    raise RuntimeError(f"JSON codec '{name}' is not installed")
+
+
+JSON_BACKEND, _loads, _dumps, _decode_errors = _select_backend(settings.JSON_CODEC)
+
+# Catch this to handle malformed input regardless of the backend in use.
+DecodeError = (ValueError, *_decode_errors)
+
+
+def loads(data: bytes | str) -> Any:
+    return _loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    return _dumps(obj)
+
+
+def dumps_str(obj: Any) -> str:
+    """String form of `dumps`, e.g. for SQLAlchemy's JSON serializer hook."""
+    return _dumps(obj).decode()
@@ -14,3 +14,10 @@ def github_ts(dt_str: str | None) -> datetime | None:
         )
     except ValueError:
         return None
+
+
+def naive_utc(dt: datetime | None) -> datetime | None:
+    """Aware datetime -> naive UTC; naive values are assumed UTC already."""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,200 @@
+"""
+Ingest-time slimming of GitHub event payloads.
+
+`payload` keeps a small per-event-type projection that readers and the
+summarizer actually use; the untouched payload is kept zlib-compressed in
+`payload_raw` and can be restored with `load_raw_payload`.
+"""
+
+import re
+import zlib
+from typing import Any, Optional
+
+from app.api.core.config import settings
+from app.api.utils import codec
+
+# A spec maps a key to None (keep the value as-is), to a nested spec (project a
+# sub-object) or to a one-element list holding the spec for each list item.
+_USER = {"id": None, "login": None}
+_COMMIT_AUTHOR = {"name": None, "email": None, "username": None}
+
+_EVENT_SPECS: dict[str, dict] = {
+    "push": {
+        "ref": None,
+        "before": None,
+        "after": None,
+        "head": None,
+        "size": None,
+        "distinct_size": None,
+        "created": None,
+        "deleted": None,
+        "forced": None,
+        "commits": [
+            {
+                "id": None,
+                "sha": None,
+                "message": None,
+                "timestamp": None,
+                "distinct": None,
+                "author": _COMMIT_AUTHOR,
+                "added": None,
+                "removed": None,
+                "modified": None,
+            }
+        ],
+        "head_commit": {"id": None, "message": None, "timestamp": None},
+        "pusher": {"name": None, "email": None},
+    },
+    "pull_request": {
+        "action": None,
+        "number": None,
+        "pull_request": {
+            "id": None,
+            "number": None,
+            "title": None,
+            "body": None,
+            "state": None,
+            "draft": None,
+            "merged": None,
+            "html_url": None,
+            "created_at": None,
+            "updated_at": None,
+            "closed_at": None,
+            "merged_at": None,
+            "commits": None,
+            "additions": None,
+            "deletions": None,
+            "changed_files": None,
+            "user": _USER,
+            "head": {"ref": None, "sha": None},
+            "base": {"ref": None, "sha": None},
+        },
+    },
+    "pull_request_review": {
+        "action": None,
+        "review": {
+            "id": None,
+            "state": None,
+            "body": None,
+            "html_url": None,
+            "submitted_at": None,
+        },
+        "pull_request": {"id": None, "number": None, "title": None},
+    },
+    "issues": {
+        "action": None,
+        "issue": {
+            "id": None,
+            "number": None,
+            "title": None,
+            "body": None,
+            "state": None,
+            "html_url": None,
+            "created_at": None,
+            "closed_at": None,
+            "user": _USER,
+            "labels": [{"name": None}],
+        },
+    },
+    "issue_comment": {
+        "action": None,
+        "issue": {"id": None, "number": None, "title": None},
+        "comment": {"id": None, "body": None, "html_url": None, "created_at": None},
+    },
+    "commit_comment": {
+        "action": None,
+        "comment": {
+            "id": None,
+            "body": None,
+            "commit_id": None,
+            "path": None,
+            "html_url": None,
+            "created_at": None,
+        },
+    },
+    "create": {"ref": None, "ref_type": None, "master_branch": None, "description": None},
+    "delete": {"ref": None, "ref_type": None},
+    "release": {
+        "action": None,
+        "release": {
+            "id": None,
+            "tag_name": None,
+            "name": None,
+            "body": None,
+            "html_url": None,
+            "prerelease": None,
+            "published_at": None,
+        },
+    },
+    "fork": {"forkee": {"id": None, "full_name": None, "html_url": None}},
+    "watch": {"action": None},
+    "public": {},
+}
+
+# Top-level keys kept for every event, covering both webhook deliveries and
+# items from the GitHub events API (which nest the body under "payload").
+_ENVELOPE_SPEC = {
+    "id": None,
+    "type": None,
+    "created_at": None,
+    "public": None,
+    "actor": _USER,
+    "repo": {"id": None, "name": None},
+    "repository": {
+        "id": None,
+        "name": None,
+        "full_name": None,
+        "private": None,
+        "html_url": None,
+    },
+    "sender": _USER,
+}
+
+
+def normalize_event_type(event_type: str) -> str:
+    """Maps events API names ("PullRequestEvent") onto webhook names ("pull_request")."""
+    if event_type.endswith("Event"):
+        event_type = event_type[: -len("Event")]
+        event_type = re.sub(r"(?<!^)(?=[A-Z])", "_", event_type).lower()
+    return {"issue": "issues"}.get(event_type, event_type)
+
+
+def _project(value: Any, spec: Any) -> Any:
+    if spec is None:
+        return value
+    if isinstance(spec, list):
+        if not isinstance(value, list):
+            return value
+        return [_project(item, spec[0]) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: _project(value[key], sub) for key, sub in spec.items() if key in value}
+
+
+def slim_payload(event_type: str, payload: dict) -> dict:
+    """
+    Returns the essential projection of a payload, or the payload itself when
+    slimming is disabled or the event type has no projection defined.
+    """
+    spec = _EVENT_SPECS.get(normalize_event_type(event_type))
+    if not settings.PAYLOAD_SLIMMING or spec is None:
+        return payload
+
+    slim = _project(payload, _ENVELOPE_SPEC)
+    if isinstance(payload.get("payload"), dict):
+        # Events API: the type-specific body lives under "payload"
+        slim["payload"] = _project(payload["payload"], spec)
+    else:
+        slim.update(_project(payload, spec))
+    return slim
+
+
+def compress_payload(raw: bytes) -> Optional[bytes]:
+    """Compresses the raw payload for the cold `payload_raw` column."""
+    if not settings.PAYLOAD_SLIMMING:
+        return None
+    return zlib.compress(raw, settings.PAYLOAD_COMPRESSION_LEVEL)
+
+
+def load_raw_payload(payload_raw: bytes) -> dict:
+    return codec.loads(zlib.decompress(payload_raw))
@@ -1,14 +1,54 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware.sessions import SessionMiddleware
 from app.api.core.config import settings
 from app.api.routers import health, auth, webhook, events
+from app.api.core.cache import listen_for_invalidations
+from app.api.core.github import github_client
+from app.api.core.ratelimit import GitHubRateLimited
+from app.api.core.security import PasswordHashingBusy
+from app.services.accounts import ensure_oauth_providers
+from app.services.commit_enrichment import commit_enricher
+from app.services.dedup import delivery_pruner
+from app.services.event_writer import event_writer
+from app.services.repository_refresher import repository_refresher
 import uvicorn
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await github_client.start()
+    try:
+        await ensure_oauth_providers()
+    except Exception as e:
+        # Not fatal: the first OAuth callback seeds them instead
+        print(f"Warning: could not seed OAuth providers at startup: {e}")
+    invalidation_listener = asyncio.create_task(listen_for_invalidations())
+    if settings.WEBHOOK_FAST_ACK:
+        event_writer.start()
+    if settings.REPO_REFRESH_ENABLED:
+        repository_refresher.start()
+    if settings.COMMIT_ENRICHMENT_ENABLED:
+        commit_enricher.start()
+    delivery_pruner.start()
+    yield
+    invalidation_listener.cancel()
+    await repository_refresher.stop()
+    await delivery_pruner.stop()
+    # Drain buffered webhook deliveries before the worker exits
+    await event_writer.stop()
+    await commit_enricher.stop()
+    await github_client.close()
+
+
 app = FastAPI(
     title="Adme: GitHub Resume & Social Media Platform",
     description="Backend for tracking GitHub activity and generating resume updates and social media suggestions",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -23,6 +63,25 @@ app.add_middleware(
 # Configure Session Middleware
 app.add_middleware(SessionMiddleware, secret_key=settings.APP_SECRET_KEY)
 
+
+@app.exception_handler(GitHubRateLimited)
+async def github_rate_limited_handler(request: Request, exc: GitHubRateLimited):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "GitHub API rate limit exceeded", "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-ins in progress, retry shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+
 # Include routers
 app.include_router(health.router, prefix="/api/v1")
 app.include_router(auth.router, prefix="/api/v1/auth")
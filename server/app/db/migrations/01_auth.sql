@@ -1,7 +1,7 @@
 
 CREATE TABLE IF NOT EXISTS public.users (
     id            UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    email         TEXT UNIQUE NOT NULL,,
+    email         TEXT UNIQUE NOT NULL,
     password      TEXT,
     full_name     TEXT,
     avatar_url    TEXT,
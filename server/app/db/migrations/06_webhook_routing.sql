@@ -0,0 +1,4 @@
+ALTER TABLE public.webhooks ADD COLUMN IF NOT EXISTS route_token TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_webhooks_route_token
+    ON public.webhooks (route_token);
@@ -0,0 +1,8 @@
+-- One row per X-GitHub-Delivery GUID; inserted with ON CONFLICT DO NOTHING so
+-- redeliveries are detected without a lookup on the github_events hypertable.
+CREATE TABLE IF NOT EXISTS public.webhook_deliveries (
+    delivery_id   UUID PRIMARY KEY,
+    received_at   TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE public.github_events ADD COLUMN IF NOT EXISTS delivery_id UUID;
@@ -0,0 +1,3 @@
+-- Cold storage for the full, zlib-compressed event payload. The JSONB
+-- `payload` column keeps only the per-event-type essential projection.
+ALTER TABLE public.github_events ADD COLUMN IF NOT EXISTS payload_raw BYTEA;
@@ -0,0 +1,6 @@
+-- When a repository row was last revalidated against GitHub. NULL rows have
+-- never been refreshed and are picked first by the background refresher.
+ALTER TABLE public.repositories ADD COLUMN IF NOT EXISTS refreshed_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_repositories_refreshed_at
+    ON public.repositories (refreshed_at NULLS FIRST);
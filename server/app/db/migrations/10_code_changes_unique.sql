@@ -0,0 +1,4 @@
+-- One row per commit per push event, so commit enrichment can bulk-insert
+-- with ON CONFLICT DO NOTHING and skip commits that are already stored.
+CREATE UNIQUE INDEX IF NOT EXISTS uq_code_changes_event_sha
+    ON public.code_changes (event_id, sha);
@@ -0,0 +1,12 @@
+-- One row per events-API event, so /events/last can insert with
+-- ON CONFLICT DO NOTHING without racing concurrent syncs. Unique indexes on
+-- the hypertable must include the partition column. Webhook deliveries leave
+-- event_id_gh NULL and are never considered duplicates here.
+DELETE FROM public.github_events duplicate
+USING public.github_events kept
+WHERE duplicate.event_id_gh = kept.event_id_gh
+  AND duplicate.occurred_at = kept.occurred_at
+  AND (duplicate.created_at, duplicate.id) > (kept.created_at, kept.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_github_events_event_id_gh
+    ON public.github_events (event_id_gh, occurred_at);
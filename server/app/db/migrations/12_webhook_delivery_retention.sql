@@ -0,0 +1,9 @@
+-- Lets the delivery ledger pruner find expired rows without a full scan.
+CREATE INDEX IF NOT EXISTS idx_webhook_deliveries_received_at
+    ON public.webhook_deliveries (received_at);
+
+-- process_github_event looks stored webhook events up by delivery_id;
+-- events-API rows leave it NULL and stay out of the index.
+CREATE INDEX IF NOT EXISTS idx_github_events_delivery_id
+    ON public.github_events (delivery_id)
+    WHERE delivery_id IS NOT NULL;
@@ -0,0 +1,89 @@
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import func
+
+from app.api.core.database import AsyncSession, AsyncSessionLocal
+from app.api.core.security import encrypt_token
+from app.api.models import OAuthProvider, User, UserOAuth
+
+OAUTH_PROVIDERS = {"github": "https://github.com"}
+
+_providers_seeded = False
+
+
+async def ensure_oauth_providers() -> None:
+    """
+    Makes sure every row in `OAUTH_PROVIDERS` exists. Runs once at startup;
+    later calls are free unless that attempt failed, in which case the next
+    OAuth callback retries it.
+    """
+    global _providers_seeded
+    if _providers_seeded:
+        return
+
+    stmt = (
+        insert(OAuthProvider)
+        .values(
+            [
+                {"provider": provider, "issuer_url": issuer_url}
+                for provider, issuer_url in OAUTH_PROVIDERS.items()
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=[OAuthProvider.provider])
+    )
+    async with AsyncSessionLocal() as session:
+        await session.execute(stmt)
+        await session.commit()
+    _providers_seeded = True
+
+
+async def upsert_oauth_user(
+    db: AsyncSession,
+    provider: str,
+    provider_uid: str,
+    email: str,
+    full_name: Optional[str],
+    avatar_url: Optional[str],
+    access_token: str,
+    refresh_token: Optional[str],
+    scope: List[str],
+    expires_at: Optional[datetime] = None,
+) -> User:
+    """
+    Creates or refreshes the user signing in through `provider` together with
+    their credentials, in one transaction. Users are matched by email; an
+    existing password is kept. Tokens are encrypted here.
+    """
+    stmt = (
+        insert(User)
+        .values(email=email, full_name=full_name, avatar_url=avatar_url, password=None)
+        .on_conflict_do_update(
+            index_elements=[User.email],
+            set_={"full_name": full_name, "avatar_url": avatar_url, "updated_at": func.now()},
+        )
+        .returning(User)
+    )
+    result = await db.execute(stmt, execution_options={"populate_existing": True})
+    user = result.scalar_one()
+
+    credentials = {
+        "provider_uid": provider_uid,
+        "access_token": encrypt_token(access_token),
+        "refresh_token": encrypt_token(refresh_token) if refresh_token else None,
+        "scope": scope,
+        "expires_at": expires_at,
+    }
+    stmt = (
+        insert(UserOAuth)
+        .values(user_id=user.id, provider=provider, **credentials)
+        .on_conflict_do_update(
+            index_elements=[UserOAuth.user_id, UserOAuth.provider],
+            # created_at doubles as "last authorised"
+            set_={**credentials, "created_at": func.now()},
+        )
+    )
+    await db.execute(stmt)
+    await db.commit()
+    return user
@@ -0,0 +1,374 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from prometheus_client import Counter, Gauge
+from sqlalchemy import cast, func, literal, select, tuple_
+from sqlalchemy.dialects.postgresql import JSONB, insert
+
+from app.api.core.config import settings
+from app.api.core.database import AsyncSession, AsyncSessionLocal, redis_client
+from app.api.core.github import GitHubClient, github_client
+from app.api.core.ratelimit import BACKGROUND, GitHubRateLimited
+from app.api.core.security import decrypt_token
+from app.api.models import CodeChanges, GitHubEvents, UserOAuth
+from app.api.utils import naive_utc
+from app.api.utils.payloads import normalize_event_type
+
+ENRICHMENT_EVENTS = Counter(
+    "commit_enrichment_events_total", "Push events offered for commit enrichment", ["result"]
+)
+ENRICHMENT_COMMITS = Counter(
+    "commit_enrichment_commits_total", "Commits considered for CodeChanges rows", ["result"]
+)
+ENRICHMENT_QUEUE_DEPTH = Gauge(
+    "commit_enrichment_queue_depth", "Push events waiting for commit enrichment"
+)
+
+
+def push_commits(event: dict) -> Tuple[Optional[str], List[str]]:
+    """
+    Returns the repository full name and commit SHAs of a push event, for both
+    webhook deliveries and events API items (which nest them under "payload").
+    """
+    payload = event.get("payload") or {}
+    body = payload.get("payload") if isinstance(payload.get("payload"), dict) else payload
+    full_name = (payload.get("repository") or {}).get("full_name") or (
+        payload.get("repo") or {}
+    ).get("name")
+    shas = []
+    for commit in body.get("commits") or []:
+        sha = commit.get("sha") or commit.get("id")
+        if sha and sha not in shas:
+            shas.append(sha)
+    return full_name, shas
+
+
+def code_changes_values(event: dict, commit: dict, max_patch_bytes: int) -> dict:
+    """Maps a REST commit object onto a `code_changes` row for one event."""
+    files = commit.get("files") or []
+    patch_parts = []
+    size = 0
+    for file in files:
+        if not file.get("patch"):
+            continue
+        part = f"diff --git a/{file.get('filename')} b/{file.get('filename')}\n{file['patch']}\n"
+        size += len(part)
+        if size > max_patch_bytes:
+            patch_parts.append("... patch truncated ...\n")
+            break
+        patch_parts.append(part)
+    return {
+        "event_id": event["id"],
+        # Events read back through RETURNING carry an aware timestamp
+        "occurred_at": naive_utc(event["occurred_at"]),
+        "sha": commit.get("sha"),
+        "patch": "".join(patch_parts) or None,
+        "files_changed": {
+            "stats": commit.get("stats"),
+            "files": [
+                {
+                    "filename": file.get("filename"),
+                    "status": file.get("status"),
+                    "additions": file.get("additions"),
+                    "deletions": file.get("deletions"),
+                    "changes": file.get("changes"),
+                    "previous_filename": file.get("previous_filename"),
+                }
+                for file in files
+            ],
+        },
+    }
+
+
+async def fetch_commits(
+    github: GitHubClient,
+    access_token: str,
+    commits: Iterable[Tuple[str, str]],
+    concurrency: Optional[int] = None,
+) -> Dict[Tuple[str, str], dict]:
+    """
+    Fetches `GET /repos/{full_name}/commits/{sha}` (with file patches) for each
+    distinct pair concurrently, at background priority. Commits that cannot be
+    fetched are skipped; `GitHubRateLimited` stops the whole fetch.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.GITHUB_FETCH_CONCURRENCY)
+
+    async def fetch_one(full_name: str, sha: str) -> Optional[dict]:
+        async with semaphore:
+            try:
+                response = await github.get(
+                    f"/repos/{full_name}/commits/{sha}", access_token, priority=BACKGROUND
+                )
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                print(f"Warning: failed to fetch commit {full_name}@{sha}: {e}")
+                return None
+            return github.json(response)
+
+    pairs = sorted(set(commits))
+    results = await asyncio.gather(*(fetch_one(*pair) for pair in pairs))
+    return {pair: commit for pair, commit in zip(pairs, results) if commit}
+
+
+async def enrich_push_events(
+    db: AsyncSession, github: GitHubClient, access_token: str, events: List[dict]
+) -> int:
+    """
+    Stores `code_changes` rows for the commits of the given push events, each
+    a dict with `id`, `occurred_at` and `payload`. Commits already stored for
+    an event are skipped, and each distinct commit is fetched once. Returns
+    the number of rows inserted; the caller commits.
+    """
+    wanted: Dict[Tuple, Tuple[dict, str, str]] = {}
+    for event in events:
+        full_name, shas = push_commits(event)
+        if not full_name:
+            continue
+        for sha in shas[: settings.COMMIT_ENRICHMENT_MAX_COMMITS]:
+            wanted[(event["id"], sha)] = (event, full_name, sha)
+    if not wanted:
+        return 0
+
+    stmt = select(CodeChanges.event_id, CodeChanges.sha).where(
+        tuple_(CodeChanges.event_id, CodeChanges.sha).in_(list(wanted))
+    )
+    result = await db.execute(stmt)
+    stored = set(result.tuples())
+    missing = {key: value for key, value in wanted.items() if key not in stored}
+    ENRICHMENT_COMMITS.labels("already_stored").inc(len(wanted) - len(missing))
+    if not missing:
+        return 0
+
+    commits = await fetch_commits(
+        github, access_token, ((full_name, sha) for _, full_name, sha in missing.values())
+    )
+    rows = [
+        code_changes_values(event, commits[(full_name, sha)], settings.COMMIT_PATCH_MAX_BYTES)
+        for event, full_name, sha in missing.values()
+        if (full_name, sha) in commits
+    ]
+    ENRICHMENT_COMMITS.labels("fetch_failed").inc(len(missing) - len(rows))
+    if not rows:
+        return 0
+
+    result = await db.execute(
+        insert(CodeChanges)
+        .values(rows)
+        .on_conflict_do_nothing(index_elements=["event_id", "sha"])
+        .returning(CodeChanges.id)
+    )
+    inserted = len(result.all())
+    ENRICHMENT_COMMITS.labels("stored").inc(inserted)
+    return inserted
+
+
+class CommitEnricher:
+    """
+    Background stage that turns stored push events into `code_changes` rows,
+    so summarization never has to call GitHub itself.
+
+    Writers `submit` push events once they are committed; the worker groups
+    them by user, fetches commit details with that user's token at background
+    priority (so interactive requests keep the rate-limit budget) and
+    bulk-inserts the rows. A user's events that hit the rate limit are queued
+    again once it allows; other failures only affect that user's events.
+
+    Every `sweep_interval` seconds, push events from the last
+    `sweep_lookback` that still have no `code_changes` are queued again. This
+    picks up events dropped on a full queue, lost in a restart, submitted
+    while the enricher was stopped or whose enrichment failed. A Redis lock
+    keeps several workers from sweeping at once.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        batch_size: int,
+        sweep_interval: float,
+        sweep_lookback: timedelta,
+        sweep_batch_size: int,
+        lock_key: str = "adme:commit-enrichment-sweep:lock",
+    ):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._batch_size = batch_size
+        self.sweep_interval = sweep_interval
+        self.sweep_lookback = sweep_lookback
+        self.sweep_batch_size = sweep_batch_size
+        self.lock_key = lock_key
+        self._task: Optional[asyncio.Task] = None
+        self._sweep_task: Optional[asyncio.Task] = None
+        ENRICHMENT_QUEUE_DEPTH.set_function(self._queue.qsize)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def submit(self, events: Iterable[dict], result: str = "queued") -> None:
+        """
+        Queues push events (dicts with `id`, `occurred_at`, `user_id`,
+        `event_type` and `payload`); other event types are ignored. Never waits.
+        """
+        if not self.running:
+            return
+        for event in events:
+            if normalize_event_type(event.get("event_type") or "") != "push":
+                continue
+            if not event.get("user_id"):
+                ENRICHMENT_EVENTS.labels("no_user").inc()
+                continue
+            try:
+                self._queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # The sweep picks these up later
+                ENRICHMENT_EVENTS.labels("dropped").inc()
+                continue
+            ENRICHMENT_EVENTS.labels(result).inc()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+        self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        for task in (self._task, self._sweep_task):
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._sweep_task = None
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self._batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                await self._process(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                ENRICHMENT_EVENTS.labels("failed").inc(len(batch))
+                print(f"Warning: commit enrichment failed for {len(batch)} events: {e}")
+
+    async def _process(self, batch: List[dict]) -> None:
+        by_user: Dict = {}
+        for event in batch:
+            by_user.setdefault(event["user_id"], []).append(event)
+
+        async with AsyncSessionLocal() as session:
+            stmt = select(UserOAuth.user_id, UserOAuth.access_token).where(
+                UserOAuth.user_id.in_(list(by_user)), UserOAuth.provider == "github"
+            )
+            result = await session.execute(stmt)
+            tokens = {user_id: token for user_id, token in result.tuples()}
+
+            for user_id, events in by_user.items():
+                if user_id not in tokens:
+                    ENRICHMENT_EVENTS.labels("no_token").inc(len(events))
+                    continue
+                try:
+                    await enrich_push_events(
+                        session, github_client, decrypt_token(tokens[user_id]), events
+                    )
+                    await session.commit()
+                except asyncio.CancelledError:
+                    raise
+                except GitHubRateLimited as e:
+                    await session.rollback()
+                    ENRICHMENT_EVENTS.labels("rate_limited").inc(len(events))
+                    # Only this user's token is limited; the others carry on
+                    asyncio.get_running_loop().call_later(
+                        e.retry_after, self.submit, events, "requeued"
+                    )
+                    continue
+                except Exception as e:
+                    await session.rollback()
+                    ENRICHMENT_EVENTS.labels("failed").inc(len(events))
+                    print(
+                        f"Warning: commit enrichment failed for user {user_id} "
+                        f"({len(events)} events): {e}"
+                    )
+                    continue
+                ENRICHMENT_EVENTS.labels("enriched").inc(len(events))
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                if await self._acquire_lock():
+                    async with AsyncSessionLocal() as session:
+                        self.submit(await self._unenriched_events(session), "swept")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warning: commit enrichment sweep failed: {e}")
+
+    async def _acquire_lock(self) -> bool:
+        try:
+            return bool(
+                await redis_client.set(
+                    self.lock_key, "1", nx=True, ex=max(1, int(self.sweep_interval))
+                )
+            )
+        except Exception:
+            # Without Redis every worker sweeps; duplicate work, not wrong results
+            return True
+
+    async def _unenriched_events(self, db: AsyncSession) -> List[dict]:
+        """
+        Recent push events with commits but no `code_changes` rows, whose user
+        has a GitHub token. Events younger than one sweep interval are left
+        alone, as they are most likely still queued.
+        """
+        now = datetime.utcnow()
+        commits = func.coalesce(
+            GitHubEvents.payload["commits"],
+            GitHubEvents.payload["payload"]["commits"],
+            cast(literal("[]"), JSONB),
+        )
+        stmt = (
+            select(
+                GitHubEvents.id,
+                GitHubEvents.occurred_at,
+                GitHubEvents.user_id,
+                GitHubEvents.event_type,
+                GitHubEvents.payload,
+            )
+            .join(
+                UserOAuth,
+                (UserOAuth.user_id == GitHubEvents.user_id)
+                & (UserOAuth.provider == "github"),
+            )
+            .where(
+                GitHubEvents.event_type.in_(["push", "PushEvent"]),
+                GitHubEvents.occurred_at >= now - self.sweep_lookback,
+                GitHubEvents.created_at < now - timedelta(seconds=self.sweep_interval),
+                func.jsonb_array_length(commits) > 0,
+                ~select(CodeChanges.id)
+                .where(
+                    CodeChanges.event_id == GitHubEvents.id,
+                    CodeChanges.occurred_at == GitHubEvents.occurred_at,
+                )
+                .exists(),
+            )
+            .order_by(GitHubEvents.occurred_at.desc())
+            .limit(self.sweep_batch_size)
+        )
+        result = await db.execute(stmt)
+        return [dict(row) for row in result.mappings()]
+
+
+commit_enricher = CommitEnricher(
+    queue_size=settings.COMMIT_ENRICHMENT_QUEUE_SIZE,
+    batch_size=settings.COMMIT_ENRICHMENT_BATCH_SIZE,
+    sweep_interval=settings.COMMIT_ENRICHMENT_SWEEP_INTERVAL_SECONDS,
+    sweep_lookback=timedelta(hours=settings.COMMIT_ENRICHMENT_SWEEP_LOOKBACK_HOURS),
+    sweep_batch_size=settings.COMMIT_ENRICHMENT_SWEEP_BATCH_SIZE,
+)
@@ -0,0 +1,189 @@
+import asyncio
+import uuid
+from datetime import timedelta
+from typing import Optional
+
+from prometheus_client import Counter
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.api.core.config import settings
+from app.api.core.database import AsyncSession, AsyncSessionLocal, redis_client
+from app.api.models import WebhookDelivery
+
+DEDUP_LOOKUPS = Counter(
+    "webhook_dedup_lookups_total",
+    "Webhook delivery de-duplication outcomes",
+    ["layer", "result"],
+)
+DELIVERIES_PRUNED = Counter(
+    "webhook_deliveries_pruned_total", "Expired rows deleted from the delivery ledger"
+)
+
+
+class DeliveryDeduplicator:
+    """
+    Detects GitHub redeliveries by their `X-GitHub-Delivery` GUID.
+
+    Redis (`SET NX EX`) answers the common case with a single round trip. The
+    `webhook_deliveries` ledger, written with `ON CONFLICT DO NOTHING`, is the
+    source of truth for deliveries older than the Redis TTL or seen while
+    Redis was unavailable.
+    """
+
+    def __init__(self, ttl_seconds: int, key_prefix: str = "adme:delivery:"):
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+
+    async def seen(self, delivery_id: uuid.UUID) -> bool:
+        """
+        Returns True if the delivery was already recorded in Redis; records it
+        otherwise.
+        """
+        try:
+            created = await redis_client.set(
+                f"{self.key_prefix}{delivery_id}", "1", nx=True, ex=self.ttl_seconds
+            )
+        except Exception as e:
+            print(f"Warning: delivery dedup cache unavailable: {e}")
+            DEDUP_LOOKUPS.labels("redis", "unavailable").inc()
+            return False
+
+        if created:
+            DEDUP_LOOKUPS.labels("redis", "miss").inc()
+            return False
+        DEDUP_LOOKUPS.labels("redis", "hit").inc()
+        return True
+
+    async def forget(self, delivery_id: uuid.UUID) -> None:
+        """Clears the Redis marker so a delivery that failed to store can be retried."""
+        try:
+            await redis_client.delete(f"{self.key_prefix}{delivery_id}")
+        except Exception:
+            pass
+
+    async def claim(self, db: AsyncSession, delivery_id: uuid.UUID) -> bool:
+        """
+        Records the delivery in the ledger inside the caller's transaction.
+        Returns False if it had already been recorded.
+        """
+        claimed = await self.claim_many(db, [delivery_id])
+        return delivery_id in claimed
+
+    async def claim_many(
+        self, db: AsyncSession, delivery_ids: list[uuid.UUID]
+    ) -> set[uuid.UUID]:
+        """Batch form of `claim`; returns the delivery IDs that were new."""
+        if not delivery_ids:
+            return set()
+        stmt = (
+            insert(WebhookDelivery)
+            .values([{"delivery_id": delivery_id} for delivery_id in delivery_ids])
+            .on_conflict_do_nothing()
+            .returning(WebhookDelivery.delivery_id)
+        )
+        result = await db.execute(stmt)
+        claimed = set(result.scalars())
+        DEDUP_LOOKUPS.labels("ledger", "miss").inc(len(claimed))
+        DEDUP_LOOKUPS.labels("ledger", "hit").inc(len(set(delivery_ids)) - len(claimed))
+        return claimed
+
+
+class DeliveryLedgerPruner:
+    """
+    Keeps `webhook_deliveries` from growing forever.
+
+    Every `interval` seconds it deletes ledger rows older than `retention`, in
+    chunks of `batch_size`. GitHub only redelivers recent deliveries, so older
+    GUIDs can no longer come back. A Redis lock keeps several workers from
+    pruning at once.
+    """
+
+    def __init__(
+        self,
+        retention: timedelta,
+        interval: float,
+        batch_size: int,
+        lock_key: str = "adme:delivery-prune:lock",
+    ):
+        self.retention = retention
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lock_key = lock_key
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if await self._acquire_lock():
+                    async with AsyncSessionLocal() as session:
+                        await self.prune(session)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warning: delivery ledger pruning failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _acquire_lock(self) -> bool:
+        try:
+            return bool(
+                await redis_client.set(
+                    self.lock_key, "1", nx=True, ex=max(1, int(self.interval))
+                )
+            )
+        except Exception:
+            # Without Redis every worker prunes; duplicate work, not wrong results
+            return True
+
+    async def prune(self, db: AsyncSession) -> int:
+        """Deletes expired ledger rows; returns how many were deleted."""
+        total = 0
+        while True:
+            expired = (
+                select(WebhookDelivery.delivery_id)
+                .where(WebhookDelivery.received_at < func.now() - self.retention)
+                .limit(self.batch_size)
+            )
+            result = await db.execute(
+                delete(WebhookDelivery).where(WebhookDelivery.delivery_id.in_(expired))
+            )
+            # Short transactions keep the ledger free for concurrent claims
+            await db.commit()
+            total += result.rowcount
+            DELIVERIES_PRUNED.inc(result.rowcount)
+            if result.rowcount < self.batch_size:
+                return total
+
+
+def parse_delivery_id(delivery_id: str) -> Optional[uuid.UUID]:
+    try:
+        return uuid.UUID(delivery_id)
+    except (TypeError, ValueError):
+        return None
+
+
+delivery_dedup = DeliveryDeduplicator(ttl_seconds=settings.WEBHOOK_DEDUP_TTL_SECONDS)
+delivery_pruner = DeliveryLedgerPruner(
+    retention=timedelta(days=settings.WEBHOOK_DELIVERY_RETENTION_DAYS),
+    interval=settings.WEBHOOK_DELIVERY_PRUNE_INTERVAL_SECONDS,
+    batch_size=settings.WEBHOOK_DELIVERY_PRUNE_BATCH_SIZE,
+)
@@ -0,0 +1,173 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy.dialects.postgresql import insert
+
+from app.api.core.config import settings
+from app.api.core.database import AsyncSessionLocal
+from app.api.models import GitHubEvents
+from app.services.commit_enrichment import commit_enricher
+from app.services.dedup import delivery_dedup
+
+EVENTS_BUFFERED = Counter(
+    "webhook_events_buffered_total", "Webhook deliveries accepted into the buffer"
+)
+EVENTS_REJECTED = Counter(
+    "webhook_events_rejected_total", "Webhook deliveries rejected by a full buffer"
+)
+EVENTS_FLUSHED = Counter(
+    "webhook_events_flushed_total", "Buffered webhook deliveries written to the DB"
+)
+EVENTS_FAILED = Counter(
+    "webhook_events_failed_total", "Buffered webhook deliveries that could not be written"
+)
+FLUSH_BATCH_SIZE = Histogram(
+    "webhook_flush_batch_size",
+    "Rows written per buffered flush",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+FLUSH_LATENCY = Histogram(
+    "webhook_flush_latency_seconds", "Time spent writing one buffered batch"
+)
+BUFFER_DEPTH = Gauge("webhook_buffer_depth", "Webhook deliveries waiting to be flushed")
+
+
+class EventBufferFull(Exception):
+    """Raised when the ingest buffer cannot accept another delivery."""
+
+
+class EventBatchWriter:
+    """
+    Buffers verified webhook deliveries in memory and writes them to
+    `github_events` as one multi-row insert per `flush_rows` rows or per
+    `flush_interval_ms` milliseconds, whichever comes first.
+    """
+
+    def __init__(self, buffer_size: int, flush_rows: int, flush_interval_ms: int):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+        self._flush_rows = flush_rows
+        self._flush_interval = flush_interval_ms / 1000
+        self._stopping = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def submit(self, row: dict) -> None:
+        """Queues a `github_events` row without waiting for the database."""
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            EVENTS_REJECTED.inc()
+            raise EventBufferFull("Webhook ingest buffer is full")
+        EVENTS_BUFFERED.inc()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flushes whatever is still buffered, then stops the writer task."""
+        if not self.running:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def _run(self) -> None:
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = await self._next_batch()
+            if batch:
+                await self._flush(batch)
+
+    async def _next_batch(self) -> List[dict]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._flush_interval
+        batch: List[dict] = []
+        while len(batch) < self._flush_rows:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            timeout = deadline - loop.time()
+            if timeout <= 0 or self._stopping.is_set():
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush(self, batch: List[dict]) -> None:
+        started = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as session:
+                stored = await self._write(session, batch)
+                await session.commit()
+        except Exception as e:
+            print(f"Error flushing {len(batch)} buffered events, retrying per row: {e}")
+            await self._flush_rows_individually(batch)
+        else:
+            EVENTS_FLUSHED.inc(len(stored))
+            FLUSH_BATCH_SIZE.observe(len(stored))
+            commit_enricher.submit(stored)
+        FLUSH_LATENCY.observe(time.perf_counter() - started)
+
+    async def _write(self, session, rows: List[dict]) -> List[dict]:
+        """Inserts the rows not stored yet and returns them with their new `id`."""
+        # Collapse repeats inside the batch, then let the delivery ledger drop
+        # anything stored by an earlier flush or another worker.
+        rows_by_delivery = {row["delivery_id"]: row for row in rows}
+        claimed = await delivery_dedup.claim_many(session, list(rows_by_delivery))
+        new_rows = [row for key, row in rows_by_delivery.items() if key in claimed]
+        if new_rows:
+            result = await session.execute(
+                insert(GitHubEvents)
+                .values(new_rows)
+                .on_conflict_do_nothing()
+                .returning(GitHubEvents.id, GitHubEvents.delivery_id)
+            )
+            ids = {delivery_id: event_id for event_id, delivery_id in result.tuples()}
+            return [
+                {**row, "id": ids[row["delivery_id"]]}
+                for row in new_rows
+                if row["delivery_id"] in ids
+            ]
+        return []
+
+    async def _flush_rows_individually(self, batch: List[dict]) -> None:
+        # Isolate the row(s) that broke the batch so the rest still land.
+        async with AsyncSessionLocal() as session:
+            for row in batch:
+                try:
+                    stored = await self._write(session, [row])
+                    await session.commit()
+                    EVENTS_FLUSHED.inc(len(stored))
+                    commit_enricher.submit(stored)
+                except Exception as e:
+                    await session.rollback()
+                    await delivery_dedup.forget(row["delivery_id"])
+                    EVENTS_FAILED.inc()
+                    print(
+                        f"Error storing buffered delivery {row.get('delivery_id')} "
+                        f"for repo {row.get('repo_id')}: {e}"
+                    )
+
+
+event_writer = EventBatchWriter(
+    buffer_size=settings.WEBHOOK_BUFFER_SIZE,
+    flush_rows=settings.WEBHOOK_FLUSH_ROWS,
+    flush_interval_ms=settings.WEBHOOK_FLUSH_INTERVAL_MS,
+)
+BUFFER_DEPTH.set_function(lambda: event_writer.pending)
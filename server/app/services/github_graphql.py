@@ -0,0 +1,188 @@
+"""
+Batched lookups through GitHub's GraphQL API.
+
+Many repositories are resolved in one aliased query instead of one REST call
+each. Results are reshaped into the REST objects the rest of the code
+already consumes. Anything GraphQL cannot resolve is reported as missing so
+callers can fall back to REST.
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx
+from prometheus_client import Counter
+
+from app.api.core.config import settings
+from app.api.core.github import GitHubClient
+from app.api.core.ratelimit import INTERACTIVE
+
+GRAPHQL_QUERIES = Counter(
+    "github_graphql_queries_total", "Batched GraphQL queries sent to GitHub", ["kind", "result"]
+)
+GRAPHQL_ITEMS = Counter(
+    "github_graphql_items_total",
+    "Objects resolved through batched GraphQL queries",
+    ["kind", "result"],
+)
+GRAPHQL_COST = Counter(
+    "github_graphql_cost_points_total", "Rate-limit points charged for GraphQL queries"
+)
+
+REPOSITORY_TOPICS = 20
+
+_REPOSITORY_FIELDS = f"""
+    databaseId
+    id
+    name
+    nameWithOwner
+    owner {{ __typename login }}
+    isPrivate
+    defaultBranchRef {{ name }}
+    description
+    primaryLanguage {{ name }}
+    repositoryTopics(first: {REPOSITORY_TOPICS}) {{ nodes {{ topic {{ name }} }} }}
+    homepageUrl
+    licenseInfo {{ key name spdxId url }}
+    stargazerCount
+    forkCount
+    createdAt
+    updatedAt
+    pushedAt
+"""
+
+# Nodes each alias may return; used to keep a query inside the node budget
+_REPOSITORY_NODES = 1 + REPOSITORY_TOPICS
+
+
+def _batches(items: list, nodes_per_item: int) -> Iterable[list]:
+    size = max(
+        1,
+        min(
+            settings.GITHUB_GRAPHQL_MAX_ALIASES,
+            settings.GITHUB_GRAPHQL_NODE_BUDGET // nodes_per_item,
+        ),
+    )
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _split_full_name(full_name: str) -> Optional[Tuple[str, str]]:
+    owner, _, name = full_name.partition("/")
+    if not owner or not name:
+        return None
+    return owner, name
+
+
+async def _run_query(
+    github: GitHubClient,
+    access_token: str,
+    kind: str,
+    query: str,
+    variables: dict,
+    priority: str,
+) -> Optional[dict]:
+    """
+    Sends one query and returns its `data`, or None if the whole query failed.
+    Per-alias errors (e.g. NOT_FOUND) leave that alias null in `data`.
+    """
+    try:
+        response = await github.post(
+            "/graphql",
+            access_token,
+            json={"query": query, "variables": variables},
+            priority=priority,
+        )
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        print(f"Warning: GitHub GraphQL {kind} query failed: {e}")
+        GRAPHQL_QUERIES.labels(kind, "failed").inc()
+        return None
+
+    body = github.json(response)
+    data = body.get("data")
+    if not data:
+        print(f"Warning: GitHub GraphQL {kind} query returned errors: {body.get('errors')}")
+        GRAPHQL_QUERIES.labels(kind, "failed").inc()
+        return None
+
+    GRAPHQL_QUERIES.labels(kind, "ok").inc()
+    GRAPHQL_COST.inc((data.get("rateLimit") or {}).get("cost") or 0)
+    return data
+
+
+def graphql_repository_to_rest(node: dict) -> dict:
+    """Reshapes a GraphQL `Repository` into the REST `GET /repos/{full_name}` object."""
+    owner = node.get("owner") or {}
+    license_info = node.get("licenseInfo")
+    return {
+        "id": node.get("databaseId"),
+        "node_id": node.get("id"),
+        "name": node.get("name"),
+        "full_name": node.get("nameWithOwner"),
+        "owner": {"login": owner.get("login"), "type": owner.get("__typename")},
+        "private": node.get("isPrivate", False),
+        "default_branch": (node.get("defaultBranchRef") or {}).get("name"),
+        "description": node.get("description"),
+        "language": (node.get("primaryLanguage") or {}).get("name"),
+        "topics": [
+            topic["topic"]["name"]
+            for topic in (node.get("repositoryTopics") or {}).get("nodes", [])
+        ],
+        "homepage": node.get("homepageUrl") or None,
+        "license": {
+            "key": license_info.get("key"),
+            "name": license_info.get("name"),
+            "spdx_id": license_info.get("spdxId"),
+            "url": license_info.get("url"),
+        }
+        if license_info
+        else None,
+        "stargazers_count": node.get("stargazerCount", 0),
+        "forks_count": node.get("forkCount", 0),
+        "created_at": node.get("createdAt"),
+        "updated_at": node.get("updatedAt"),
+        "pushed_at": node.get("pushedAt"),
+    }
+
+
+async def fetch_repositories_graphql(
+    github: GitHubClient,
+    access_token: str,
+    full_names: Iterable[str],
+    priority: str = INTERACTIVE,
+) -> Dict[str, dict]:
+    """
+    Resolves repositories by "owner/name" in aliased GraphQL queries. Returns
+    REST-shaped objects keyed by the requested full name; names GraphQL could
+    not resolve are left out.
+    """
+    names = sorted({name for name in full_names if name and _split_full_name(name)})
+    resolved: Dict[str, dict] = {}
+    for batch in _batches(names, _REPOSITORY_NODES):
+        declarations, selections, variables = [], [], {}
+        for index, full_name in enumerate(batch):
+            owner, name = _split_full_name(full_name)
+            declarations.append(f"$o{index}: String!, $n{index}: String!")
+            selections.append(
+                f"r{index}: repository(owner: $o{index}, name: $n{index}) {{ ...RepositoryFields }}"
+            )
+            variables[f"o{index}"] = owner
+            variables[f"n{index}"] = name
+        query = (
+            f"query({', '.join(declarations)}) {{\n"
+            + "\n".join(selections)
+            + "\nrateLimit { cost remaining }\n}\n"
+            + f"fragment RepositoryFields on Repository {{{_REPOSITORY_FIELDS}}}"
+        )
+
+        data = await _run_query(github, access_token, "repository", query, variables, priority)
+        if data is None:
+            continue
+        for index, full_name in enumerate(batch):
+            node = data.get(f"r{index}")
+            if node:
+                resolved[full_name] = graphql_repository_to_rest(node)
+
+    GRAPHQL_ITEMS.labels("repository", "resolved").inc(len(resolved))
+    GRAPHQL_ITEMS.labels("repository", "missing").inc(len(names) - len(resolved))
+    return resolved
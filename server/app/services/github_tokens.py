@@ -0,0 +1,88 @@
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.api.core.cache import TTLCache, publish_invalidation
+from app.api.core.config import settings
+from app.api.core.database import AsyncSession
+from app.api.core.security import decrypt_token
+from app.api.models import User, UserOAuth
+
+# Decrypted tokens stay in this process only; invalidation messages carry the
+# user ID, never the token.
+github_token_cache = TTLCache(
+    "github_tokens",
+    maxsize=settings.GITHUB_TOKEN_CACHE_SIZE,
+    ttl=settings.GITHUB_TOKEN_CACHE_TTL_SECONDS,
+)
+
+
+async def get_github_token(db: AsyncSession, user_id: uuid.UUID) -> Optional[str]:
+    """
+    Returns the user's decrypted GitHub access token, or None if they have not
+    connected GitHub. Only cache misses touch the database or decrypt.
+    """
+    key = str(user_id)
+    cached = github_token_cache.get(key)
+    if cached is not None:
+        return cached
+
+    stmt = select(UserOAuth.access_token).where(
+        UserOAuth.user_id == user_id, UserOAuth.provider == "github"
+    )
+    result = await db.execute(stmt)
+    encrypted = result.scalar_one_or_none()
+    if encrypted is None:
+        return None
+
+    token = decrypt_token(encrypted)
+    github_token_cache.set(key, token)
+    return token
+
+
+@dataclass(frozen=True)
+class GitHubCredentials:
+    """An existing user and their decrypted GitHub token, if they connected GitHub."""
+
+    user_id: uuid.UUID
+    access_token: Optional[str]
+
+
+async def load_github_credentials(
+    db: AsyncSession, user_id: uuid.UUID
+) -> Optional[GitHubCredentials]:
+    """
+    Resolves a user and their GitHub token together; None if the user does not
+    exist. A cached token implies the user exists, so hot users skip the
+    database; otherwise one outer JOIN answers both questions.
+    """
+    key = str(user_id)
+    cached = github_token_cache.get(key)
+    if cached is not None:
+        return GitHubCredentials(user_id=user_id, access_token=cached)
+
+    stmt = (
+        select(User.id, UserOAuth.access_token)
+        .outerjoin(
+            UserOAuth,
+            (UserOAuth.user_id == User.id) & (UserOAuth.provider == "github"),
+        )
+        .where(User.id == user_id)
+    )
+    result = await db.execute(stmt)
+    row = result.first()
+    if row is None:
+        return None
+    if row.access_token is None:
+        return GitHubCredentials(user_id=user_id, access_token=None)
+
+    token = decrypt_token(row.access_token)
+    github_token_cache.set(key, token)
+    return GitHubCredentials(user_id=user_id, access_token=token)
+
+
+async def invalidate_github_token(user_id: uuid.UUID) -> None:
+    """Evicts a user's token from every worker after it is rotated."""
+    await publish_invalidation(github_token_cache.name, str(user_id))
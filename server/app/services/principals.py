@@ -0,0 +1,66 @@
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.api.core.cache import TTLCache, publish_invalidation
+from app.api.core.config import settings
+from app.api.core.database import AsyncSession
+from app.api.core.security import ACCESS_TOKEN_EXPIRE_MINUTES
+from app.api.models import User
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user's profile, detached from any session."""
+
+    id: uuid.UUID
+    email: str
+    full_name: Optional[str]
+    avatar_url: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_model(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            full_name=user.full_name,
+            avatar_url=user.avatar_url,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+# Never outlive an access token, so a cached principal cannot be older than
+# the token that was checked against it.
+principal_cache = TTLCache(
+    "principals",
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=min(settings.PRINCIPAL_CACHE_TTL_SECONDS, ACCESS_TOKEN_EXPIRE_MINUTES * 60),
+)
+
+
+async def get_principal(db: AsyncSession, user_id: uuid.UUID) -> Optional[Principal]:
+    """Loads a user's principal; only cache misses touch the database."""
+    key = str(user_id)
+    cached = principal_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is None:
+        return None
+
+    principal = Principal.from_model(user)
+    principal_cache.set(key, principal)
+    return principal
+
+
+async def invalidate_principal(user_id: uuid.UUID) -> None:
+    """Evicts a user's principal from every worker after their profile changes."""
+    await publish_invalidation(principal_cache.name, str(user_id))
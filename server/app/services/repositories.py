@@ -0,0 +1,186 @@
+import asyncio
+from typing import Iterable, List, Optional
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.api.core.config import settings
+from app.api.core.database import AsyncSession
+from app.api.core.github import GitHubClient
+from app.api.core.ratelimit import INTERACTIVE
+from app.api.models import Repository
+from app.services.github_graphql import fetch_repositories_graphql
+from app.api.utils import github_ts
+
+# Keeps multi-row statements well under asyncpg's 32767 bind-parameter limit
+UPSERT_CHUNK_ROWS = 1000
+
+
+def repository_values(repo_data: dict) -> dict:
+    """Maps a GitHub REST repository object onto the columns of `repositories`."""
+    owner = repo_data.get("owner") or {}
+    return {
+        "id": repo_data.get("id"),
+        "node_id": repo_data.get("node_id"),
+        "name": repo_data.get("name"),
+        "full_name": repo_data.get("full_name"),
+        "owner_login": owner.get("login"),
+        # The schema spells it 'organisation'; GitHub sends "Organization"
+        "owner_type": "organisation"
+        if (owner.get("type") or "").lower() == "organization"
+        else "user",
+        "private": repo_data.get("private", False),
+        "default_branch": repo_data.get("default_branch"),
+        "description": repo_data.get("description"),
+        "language": repo_data.get("language"),
+        "topics": repo_data.get("topics", []),
+        "homepage": repo_data.get("homepage"),
+        "license": repo_data.get("license"),
+        "stargazers_count": repo_data.get("stargazers_count", 0),
+        "forks_count": repo_data.get("forks_count", 0),
+        "created_at_gh": github_ts(repo_data.get("created_at")),
+        "updated_at_gh": github_ts(repo_data.get("updated_at")),
+        "pushed_at_gh": github_ts(repo_data.get("pushed_at")),
+    }
+
+
+async def existing_repository_ids(db: AsyncSession, repo_ids: Iterable[int]) -> set[int]:
+    repo_ids = set(repo_ids)
+    if not repo_ids:
+        return set()
+    result = await db.execute(select(Repository.id).where(Repository.id.in_(repo_ids)))
+    return set(result.scalars())
+
+
+async def insert_repositories(db: AsyncSession, rows: List[dict]) -> None:
+    """
+    Inserts repository rows in a single statement, leaving rows that already
+    exist untouched. The caller commits.
+    """
+    if not rows:
+        return
+    await db.execute(insert(Repository).values(rows).on_conflict_do_nothing())
+
+
+async def upsert_repositories(db: AsyncSession, rows: List[dict]) -> List[Repository]:
+    """
+    Inserts or refreshes repository rows in batched `INSERT ... ON CONFLICT
+    (id) DO UPDATE` statements and returns the stored rows. The caller commits.
+    """
+    # Rows come straight from GitHub, so they count as freshly revalidated
+    rows = [{**row, "refreshed_at": func.now()} for row in rows]
+    repositories: List[Repository] = []
+    for start in range(0, len(rows), UPSERT_CHUNK_ROWS):
+        stmt = insert(Repository).values(rows[start : start + UPSERT_CHUNK_ROWS])
+        refreshed = {
+            column: stmt.excluded[column]
+            for column in rows[0]
+            if column != "id"
+        }
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Repository.id],
+            set_={**refreshed, "updated_at": func.now()},
+        ).returning(Repository)
+        result = await db.execute(stmt, execution_options={"populate_existing": True})
+        repositories.extend(result.scalars())
+    return repositories
+
+
+async def fetch_all_pages(
+    github: GitHubClient,
+    access_token: str,
+    url: str,
+    params: Optional[dict] = None,
+    concurrency: Optional[int] = None,
+) -> List[dict]:
+    """
+    Fetches every page of a paginated GitHub list endpoint. The page count is
+    read from the first response's `Link: rel="last"`, and the remaining pages
+    are fetched concurrently. Raises `httpx.HTTPStatusError` if any page fails.
+    """
+    params = {"per_page": 100, **(params or {})}
+    first = await github.get(url, access_token, params=params)
+    first.raise_for_status()
+    items = list(github.json(first))
+
+    last_url = first.links.get("last", {}).get("url")
+    if not last_url:
+        return items
+    try:
+        last_page = int(httpx.URL(last_url).params.get("page", "1"))
+    except ValueError:
+        return items
+
+    semaphore = asyncio.Semaphore(concurrency or settings.GITHUB_FETCH_CONCURRENCY)
+
+    async def fetch_page(page: int) -> list:
+        async with semaphore:
+            response = await github.get(url, access_token, params={**params, "page": page})
+            response.raise_for_status()
+            return github.json(response)
+
+    pages = await asyncio.gather(*(fetch_page(page) for page in range(2, last_page + 1)))
+    for page in pages:
+        items.extend(page)
+    return items
+
+
+async def fetch_repositories(
+    github: GitHubClient,
+    access_token: str,
+    full_names: Iterable[str],
+    concurrency: Optional[int] = None,
+    priority: str = INTERACTIVE,
+) -> List[dict]:
+    """
+    Fetches repositories by full name. They are resolved in batched GraphQL
+    queries when GITHUB_GRAPHQL_ENABLED is set; whatever GraphQL cannot
+    resolve falls back to concurrent `GET /repos/{full_name}` calls.
+    Repositories that cannot be fetched either way are skipped.
+
+    GraphQL queries are POSTs and bypass the ETag cache; callers revalidating
+    repositories they already store should use `fetch_repositories_rest`.
+    """
+    names = sorted({name for name in full_names if name})
+    resolved = {}
+    if settings.GITHUB_GRAPHQL_ENABLED and names:
+        resolved = await fetch_repositories_graphql(
+            github, access_token, names, priority=priority
+        )
+    remaining = [name for name in names if name not in resolved]
+    fetched = await fetch_repositories_rest(
+        github, access_token, remaining, concurrency, priority
+    )
+    return list(resolved.values()) + fetched
+
+
+async def fetch_repositories_rest(
+    github: GitHubClient,
+    access_token: str,
+    full_names: Iterable[str],
+    concurrency: Optional[int] = None,
+    priority: str = INTERACTIVE,
+) -> List[dict]:
+    """
+    Fetches `GET /repos/{full_name}` for each distinct name concurrently, with
+    at most `concurrency` requests in flight. Repositories that cannot be
+    fetched are skipped.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.GITHUB_FETCH_CONCURRENCY)
+
+    async def fetch_one(full_name: str) -> Optional[dict]:
+        async with semaphore:
+            try:
+                response = await github.get(
+                    f"/repos/{full_name}", access_token, priority=priority
+                )
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                print(f"Warning: failed to fetch repository {full_name}: {e}")
+                return None
+            return github.json(response)
+
+    names = sorted({name for name in full_names if name})
+    results = await asyncio.gather(*(fetch_one(name) for name in names))
+    return [repo_data for repo_data in results if repo_data]
@@ -0,0 +1,190 @@
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from prometheus_client import Counter, Histogram
+from sqlalchemy import func, or_, select, union, update
+
+from app.api.core.config import settings
+from app.api.core.database import AsyncSession, AsyncSessionLocal, redis_client
+from app.api.core.github import github_client
+from app.api.core.ratelimit import BACKGROUND, GitHubRateLimited
+from app.api.core.security import decrypt_token
+from app.api.models import Repository, UserOAuth, UserRepository, Webhook
+from app.services.repositories import (
+    fetch_repositories_rest,
+    repository_values,
+    upsert_repositories,
+)
+
+REPOS_REFRESHED = Counter(
+    "repository_refresh_total", "Repositories revalidated in the background", ["result"]
+)
+REFRESH_CYCLE_LATENCY = Histogram(
+    "repository_refresh_cycle_seconds", "Time spent on one background refresh batch"
+)
+
+
+class RepositoryRefresher:
+    """
+    Keeps `repositories` rows from drifting away from GitHub.
+
+    Every `interval` seconds it takes the `batch_size` rows whose
+    `refreshed_at` is oldest (never-refreshed rows first), revalidates them
+    with background-priority conditional GETs and upserts the results. Readers
+    keep using whatever row is stored; they never wait on a refresh.
+
+    Repositories are fetched with the token of a user linked to them through a
+    webhook or `user_repository`, so private repositories can be refreshed.
+    A Redis lock keeps several workers from refreshing the same batch.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        batch_size: int,
+        stale_after: float,
+        lock_key: str = "adme:repository-refresh:lock",
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.stale_after = stale_after
+        self.lock_key = lock_key
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            delay = self.interval
+            try:
+                if await self._acquire_lock():
+                    started = time.perf_counter()
+                    async with AsyncSessionLocal() as session:
+                        await self.refresh_batch(session)
+                    REFRESH_CYCLE_LATENCY.observe(time.perf_counter() - started)
+            except asyncio.CancelledError:
+                raise
+            except GitHubRateLimited as e:
+                delay = max(delay, e.retry_after)
+            except Exception as e:
+                print(f"Warning: repository refresh failed: {e}")
+            await asyncio.sleep(delay)
+
+    async def _acquire_lock(self) -> bool:
+        try:
+            return bool(
+                await redis_client.set(
+                    self.lock_key, "1", nx=True, ex=max(1, int(self.interval))
+                )
+            )
+        except Exception:
+            # Without Redis every worker refreshes; duplicate work, not wrong results
+            return True
+
+    async def refresh_batch(self, db: AsyncSession) -> int:
+        """Revalidates one batch of the stalest repositories; returns how many were upserted."""
+        stale = await self._stale_repositories(db)
+        if not stale:
+            return 0
+
+        by_token: Dict[str, List[str]] = defaultdict(list)
+        names = {}
+        for repo_id, full_name, encrypted_token in stale:
+            by_token[decrypt_token(encrypted_token)].append(full_name)
+            names[full_name] = repo_id
+
+        results = await asyncio.gather(
+            *(
+                # REST only: its conditional GETs revalidate unchanged
+                # repositories for free, where GraphQL would spend points
+                fetch_repositories_rest(
+                    github_client, token, full_names, priority=BACKGROUND
+                )
+                for token, full_names in by_token.items()
+            ),
+            return_exceptions=True,
+        )
+        fetched = []
+        rate_limited = None
+        for result in results:
+            if isinstance(result, GitHubRateLimited):
+                rate_limited = result
+            elif isinstance(result, Exception):
+                print(f"Warning: repository refresh fetch failed: {result}")
+            else:
+                fetched.extend(result)
+
+        rows = [repository_values(repo_data) for repo_data in fetched]
+        await upsert_repositories(db, rows)
+
+        # Repositories that could not be fetched (deleted, access revoked) wait
+        # a full period before the next attempt instead of blocking the queue.
+        refreshed_ids = {row["id"] for row in rows}
+        failed_ids = [repo_id for repo_id in names.values() if repo_id not in refreshed_ids]
+        if failed_ids and rate_limited is None:
+            await db.execute(
+                update(Repository)
+                .where(Repository.id.in_(failed_ids))
+                .values(refreshed_at=func.now(), updated_at=Repository.updated_at)
+            )
+            REPOS_REFRESHED.labels("failed").inc(len(failed_ids))
+        await db.commit()
+
+        REPOS_REFRESHED.labels("refreshed").inc(len(rows))
+        if rate_limited is not None:
+            # Whatever was fetched is stored; the rest waits for the quota
+            raise rate_limited
+        return len(rows)
+
+    async def _stale_repositories(self, db: AsyncSession) -> list:
+        """Oldest-refreshed repositories together with one linked user's token."""
+        linked_users = union(
+            select(Webhook.repo_id, Webhook.user_id),
+            select(UserRepository.repo_id, UserRepository.user_id),
+        ).subquery()
+        # refreshed_at is a naive UTC column, like the rest of the schema
+        cutoff = datetime.utcnow() - timedelta(seconds=self.stale_after)
+        stmt = (
+            select(Repository.id, Repository.full_name, UserOAuth.access_token)
+            .join(linked_users, linked_users.c.repo_id == Repository.id)
+            .join(
+                UserOAuth,
+                (UserOAuth.user_id == linked_users.c.user_id)
+                & (UserOAuth.provider == "github"),
+            )
+            .where(
+                or_(Repository.refreshed_at.is_(None), Repository.refreshed_at < cutoff)
+            )
+            .distinct(Repository.refreshed_at, Repository.id)
+            .order_by(Repository.refreshed_at.asc().nulls_first(), Repository.id)
+            .limit(self.batch_size)
+        )
+        result = await db.execute(stmt)
+        return result.all()
+
+
+repository_refresher = RepositoryRefresher(
+    interval=settings.REPO_REFRESH_INTERVAL_SECONDS,
+    batch_size=settings.REPO_REFRESH_BATCH_SIZE,
+    stale_after=settings.REPO_STALE_AFTER_SECONDS,
+)
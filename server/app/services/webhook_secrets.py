@@ -0,0 +1,90 @@
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.api.core.cache import TTLCache, publish_invalidation
+from app.api.core.config import settings
+from app.api.core.database import AsyncSession
+from app.api.models import Webhook
+
+
+@dataclass(frozen=True)
+class WebhookSecret:
+    """The parts of a `Webhook` row the receiver needs to accept a delivery."""
+
+    webhook_id: uuid.UUID
+    user_id: uuid.UUID
+    repo_id: int
+    github_webhook_id: int
+    secret: str
+    route_token: Optional[str] = None
+
+    @classmethod
+    def from_model(cls, webhook: Webhook) -> "WebhookSecret":
+        return cls(
+            webhook_id=webhook.id,
+            user_id=webhook.user_id,
+            repo_id=webhook.repo_id,
+            github_webhook_id=webhook.github_webhook_id,
+            secret=webhook.secret,
+            route_token=webhook.route_token,
+        )
+
+
+webhook_secret_cache = TTLCache(
+    "webhook_secrets",
+    maxsize=settings.WEBHOOK_SECRET_CACHE_SIZE,
+    ttl=settings.WEBHOOK_SECRET_CACHE_TTL_SECONDS,
+)
+
+
+def _cache_keys(webhook: Webhook) -> list[str]:
+    keys = [f"hook:{webhook.github_webhook_id}", f"repo:{webhook.repo_id}"]
+    if webhook.route_token:
+        keys.append(f"token:{webhook.route_token}")
+    return keys
+
+
+async def get_webhook_secret(
+    db: AsyncSession,
+    route_token: Optional[str] = None,
+    github_webhook_id: Optional[int] = None,
+    repo_id: Optional[int] = None,
+) -> Optional[WebhookSecret]:
+    """
+    Resolves the secret for a delivery by its URL routing token, or else by the
+    GitHub hook ID (sent in the `X-GitHub-Hook-ID` header), falling back to the
+    repository ID. Only cache misses touch the database.
+    """
+    if route_token is not None:
+        key = f"token:{route_token}"
+        stmt = select(Webhook).where(Webhook.route_token == route_token)
+    elif github_webhook_id is not None:
+        key = f"hook:{github_webhook_id}"
+        stmt = select(Webhook).where(Webhook.github_webhook_id == github_webhook_id)
+    elif repo_id is not None:
+        key = f"repo:{repo_id}"
+        # Several users may hook the same repo; any of their secrets will do here.
+        stmt = select(Webhook).where(Webhook.repo_id == repo_id).limit(1)
+    else:
+        return None
+
+    cached = webhook_secret_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(stmt)
+    webhook = result.scalar_one_or_none()
+    if webhook is None:
+        return None
+
+    entry = WebhookSecret.from_model(webhook)
+    webhook_secret_cache.set(key, entry)
+    return entry
+
+
+async def invalidate_webhook_secret(webhook: Webhook) -> None:
+    """Evicts a webhook's secret from every worker after it is created or deleted."""
+    await publish_invalidation(webhook_secret_cache.name, *_cache_keys(webhook))
@@ -1,3 +1,4 @@
+import uuid
 from celery import shared_task
 from sqlalchemy import select
 from app.api.core import AsyncSessionLocal
@@ -12,7 +13,7 @@ from app.api.models import Summaries
 async def process_github_event(self, delivery_id: str):
     async with AsyncSessionLocal() as db:
         stmt = select(GitHubEvents).where(
-            GitHubEvents.event_id_gh == int(delivery_id, 16),
+            GitHubEvents.delivery_id == uuid.UUID(delivery_id),
             GitHubEvents.processed.is_(False),
         )
         event = (await db.execute(stmt)).scalar_one_or_none()
@@ -1,25 +1,155 @@
+"""
+Applies the SQL files in app/db/migrations in filename order.
+
+Applied files are recorded in `schema_migrations` with a checksum, so later
+runs (every container start) only execute new files. Each file runs in its
+own transaction together with its ledger row. Files using CONCURRENTLY (e.g.
+`CREATE INDEX CONCURRENTLY`) cannot run in a transaction; they are executed
+statement by statement instead, and recorded once all statements succeeded.
+If such a file fails midway, drop any INVALID index it left before retrying.
+
+Databases created before the ledger existed already have the original
+schema (`PRE_LEDGER_MIGRATIONS`); re-running those files fails, since 05 and
+99 are not idempotent. When the ledger is empty but `public.webhooks` (from
+05) exists, those files are recorded as applied without running them and
+every later file (06 onwards) runs as usual. `--baseline` forces this for a
+database the check does not recognise.
+"""
+
 import asyncio
+import hashlib
+import os
+import re
+import sys
+import time
+
 import asyncpg
 from app.api.core.config import settings
-import os
+
+MIGRATION_DIR = "app/db/migrations"
+
+# The files the old runner applied. It re-ran everything on each start and
+# failed at 05 on an existing database, so no later file can have run there.
+PRE_LEDGER_MIGRATIONS = frozenset(
+    {
+        "00_extensions.sql",
+        "01_auth.sql",
+        "02_sources.sql",
+        "03_content.sql",
+        "04_context.sql",
+        "05_webhooks.sql",
+        "99_permissions.sql",
+    }
+)
+
+# Arbitrary constant shared by every runner, so concurrent starts take turns
+MIGRATION_LOCK_ID = 7_301_145_020
+
+LEDGER_DDL = """
+CREATE TABLE IF NOT EXISTS public.schema_migrations (
+    filename    TEXT PRIMARY KEY,
+    checksum    TEXT NOT NULL,
+    applied_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+_CONCURRENTLY = re.compile(r"\bCONCURRENTLY\b", re.IGNORECASE)
+# Comments, quoted strings and dollar-quoted bodies, which may contain ";"
+_SQL_TOKEN = re.compile(
+    r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(\$\w*\$).*?\1|;",
+    re.DOTALL,
+)
 
 
-async def init_db():
+def checksum(sql: str) -> str:
+    return hashlib.sha256(sql.encode()).hexdigest()
+
+
+def without_comments(sql: str) -> str:
+    return re.sub(r"--[^\n]*|/\*.*?\*/", "", sql, flags=re.DOTALL)
+
+
+def needs_autocommit(sql: str) -> bool:
+    return bool(_CONCURRENTLY.search(without_comments(sql)))
+
+
+def split_statements(sql: str) -> list:
+    """Splits a script on top-level semicolons."""
+    statements, start = [], 0
+    for match in _SQL_TOKEN.finditer(sql):
+        if match.group(0) == ";":
+            statements.append(sql[start : match.start()])
+            start = match.end()
+    statements.append(sql[start:])
+    return [s.strip() for s in statements if without_comments(s).strip()]
+
+
+async def apply_migration(conn: asyncpg.Connection, filename: str, sql: str) -> None:
+    record = "INSERT INTO public.schema_migrations (filename, checksum) VALUES ($1, $2)"
+    if needs_autocommit(sql):
+        for statement in split_statements(sql):
+            await conn.execute(statement)
+        await conn.execute(record, filename, checksum(sql))
+        return
+    async with conn.transaction():
+        await conn.execute(sql)
+        await conn.execute(record, filename, checksum(sql))
+
+
+async def init_db(baseline: bool = False):
     dsn = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
 
     conn = await asyncpg.connect(dsn)
+    try:
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+        await conn.execute(LEDGER_DDL)
+        applied = {
+            row["filename"]: row["checksum"]
+            for row in await conn.fetch(
+                "SELECT filename, checksum FROM public.schema_migrations"
+            )
+        }
+
+        if not applied and await conn.fetchval(
+            "SELECT to_regclass('public.webhooks') IS NOT NULL"
+        ):
+            print("Found a schema created before schema_migrations; baselining it")
+            baseline = True
 
-    migration_dir = "app/db/migrations"
-    sql_files = sorted([f for f in os.listdir(migration_dir) if f.endswith(".sql")])
+        sql_files = sorted(f for f in os.listdir(MIGRATION_DIR) if f.endswith(".sql"))
+        pending = []
+        for sql_file in sql_files:
+            with open(os.path.join(MIGRATION_DIR, sql_file), "r") as f:
+                sql = f.read()
+            if sql_file not in applied:
+                pending.append((sql_file, sql))
+            elif applied[sql_file] != checksum(sql):
+                raise RuntimeError(
+                    f"{sql_file} changed after it was applied; "
+                    "add a new migration instead of editing it"
+                )
 
-    for sql_file in sql_files:
-        with open(os.path.join(migration_dir, sql_file), "r") as f:
-            sql = f.read()
+        for sql_file, sql in pending:
+            if baseline and sql_file in PRE_LEDGER_MIGRATIONS:
+                print(f"Recording {sql_file} as applied (baseline)")
+                await conn.execute(
+                    "INSERT INTO public.schema_migrations (filename, checksum) VALUES ($1, $2)",
+                    sql_file,
+                    checksum(sql),
+                )
+                continue
             print(f"Executing {sql_file}...")
-            await conn.execute(sql)
+            started = time.perf_counter()
+            await apply_migration(conn, sql_file, sql)
+            print(f"Applied {sql_file} in {time.perf_counter() - started:.2f}s")
 
-    await conn.close()
+        print(
+            f"Migrations: {len(pending)} applied, "
+            f"{len(sql_files) - len(pending)} already up to date"
+        )
+    finally:
+        await conn.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(init_db())
+    asyncio.run(init_db(baseline="--baseline" in sys.argv[1:]))